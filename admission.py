@@ -0,0 +1,133 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+LANES = ('interactive', 'bulk')
+
+
+class Overloaded(Exception):
+    """La cola de un carril está llena: el cliente debe reintentar más tarde"""
+    def __init__(self, lane, retry_after):
+        super().__init__(f"Servicio saturado (carril {lane}), reintenta en {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Control de admisión con dos carriles de prioridad sobre `workers` huecos
+    de cálculo compartidos
+
+    - interactive (/predict): cada petición ocupa un hueco mientras calcula.
+      Cuando se libera un hueco, los interactivos en espera van primero.
+    - bulk (/predict/batch): cada lote se divide en trozos y cada trozo ocupa
+      un hueco (como mucho `bulk_concurrency` a la vez), de modo que las
+      peticiones interactivas entran entre trozo y trozo.
+
+    Si hay más de `interactive_queue` interactivos esperando, o más de
+    `bulk_queue` lotes admitidos, la petición se rechaza con Overloaded.
+    """
+    def __init__(self, workers=4, interactive_queue=64, bulk_concurrency=1, bulk_queue=8,
+                 retry_after=1):
+        if workers < 1 or bulk_concurrency < 1:
+            raise ValueError("workers y bulk_concurrency deben ser al menos 1")
+        self.workers = workers
+        self.bulk_concurrency = min(bulk_concurrency, workers)
+        self.queue_limits = {'interactive': interactive_queue, 'bulk': bulk_queue}
+        self.retry_after = retry_after
+        self.bulk_requests = 0
+
+        self._active = {lane: 0 for lane in LANES}
+        self._waiters = {lane: deque() for lane in LANES}
+        self._admitted = {lane: 0 for lane in LANES}
+        self._rejected = {lane: 0 for lane in LANES}
+
+    def _free(self):
+        return self.workers - sum(self._active.values())
+
+    def _can_start(self, lane):
+        if self._free() <= 0:
+            return False
+        if lane == 'bulk':
+            # Un trozo bulk nunca adelanta a un interactivo en espera
+            return not self._waiters['interactive'] and self._active['bulk'] < self.bulk_concurrency
+        return True
+
+    def _dispatch(self):
+        """Reparte los huecos libres: primero interactivos, luego trozos bulk"""
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and self._can_start(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._active[lane] += 1
+                    waiter.set_result(None)
+
+    async def acquire(self, lane):
+        if lane == 'interactive':
+            self._admit_interactive()
+        if not self._waiters[lane] and self._can_start(lane):
+            self._active[lane] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # El hueco ya se había concedido: devolverlo
+                self.release(lane)
+            elif waiter in self._waiters[lane]:
+                self._waiters[lane].remove(waiter)
+                self._dispatch()
+            raise
+
+    def _admit_interactive(self):
+        if len(self._waiters['interactive']) >= self.queue_limits['interactive']:
+            self._rejected['interactive'] += 1
+            raise Overloaded('interactive', self.retry_after)
+        self._admitted['interactive'] += 1
+
+    def release(self, lane):
+        self._active[lane] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane):
+        """Ocupa un hueco de cálculo del carril durante el bloque"""
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    @asynccontextmanager
+    async def bulk_request(self):
+        """Admite un lote completo; sus trozos piden huecos con slot('bulk')"""
+        if self.bulk_requests >= self.queue_limits['bulk']:
+            self._rejected['bulk'] += 1
+            raise Overloaded('bulk', self.retry_after)
+        self.bulk_requests += 1
+        self._admitted['bulk'] += 1
+        try:
+            yield
+        finally:
+            self.bulk_requests -= 1
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'free_workers': self._free(),
+            'bulk_requests': self.bulk_requests,
+            'lanes': {
+                lane: {
+                    'active': self._active[lane],
+                    'waiting': len(self._waiters[lane]),
+                    'queue_limit': self.queue_limits[lane],
+                    'admitted': self._admitted[lane],
+                    'rejected': self._rejected[lane]
+                }
+                for lane in LANES
+            }
+        }
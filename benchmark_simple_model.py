@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark del modelo basado en reglas (ml_model_simple): predict() par a par
+frente a predict_batch(). Verifica además que ambos den resultados idénticos.
+
+Uso: python benchmark_simple_model.py [n_pares] [repeticiones]
+"""
+import sys
+import time
+import random
+
+from ml_model_simple import VolunteerMLModel
+
+
+def generate_pairs(n_pairs, seed=42):
+    """
+    Pares sintéticos en la escala 0-1 del modelo simple; la mitad con
+    required_hours=0 para medir también el camino de la división por cero
+    """
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(n_pairs):
+        total_projects = rng.randint(0, 30)
+        volunteer = {
+            'reliability': rng.uniform(0, 1),
+            'punctuality': rng.uniform(0, 1),
+            'task_quality': rng.uniform(0, 1),
+            'success_rate': rng.uniform(0, 1),
+            'total_projects': total_projects,
+            'completed_projects': rng.randint(0, total_projects),
+            'total_hours': rng.uniform(0, 1500),
+            'availability_hours': rng.uniform(0, 40)
+        }
+        project = {
+            'project_duration': rng.uniform(1, 16),
+            'project_complexity': rng.uniform(1, 10),
+            'required_hours': rng.choice([0, rng.uniform(10, 60)])
+        }
+        pairs.append((volunteer, project))
+    return pairs
+
+
+def best_of(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(n_pairs=100000, repeats=5):
+    model = VolunteerMLModel()
+    pairs = generate_pairs(n_pairs)
+
+    expected = [model.predict(v, p) for v, p in pairs]
+    actual = model.predict_batch(pairs)
+    if expected != actual:
+        mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+        raise AssertionError(f"predict_batch difiere de predict en {mismatches} pares")
+    print(f"✅ Resultados idénticos en {n_pairs} pares")
+
+    per_call = best_of(lambda: [model.predict(v, p) for v, p in pairs], repeats)
+    batch = best_of(lambda: model.predict_batch(pairs), repeats)
+
+    print(f"predict (par a par): {per_call * 1000:8.1f} ms  ({n_pairs / per_call:,.0f} pares/s)")
+    print(f"predict_batch:       {batch * 1000:8.1f} ms  ({n_pairs / batch:,.0f} pares/s)")
+    print(f"Aceleración: {per_call / batch:.2f}x")
+
+
+if __name__ == "__main__":
+    n_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run_benchmark(n_pairs, repeats)
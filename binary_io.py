@@ -0,0 +1,131 @@
+import struct
+import numpy as np
+
+# Arrow es opcional: sin pyarrow solo se acepta el formato binario propio
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+RAW_MEDIA_TYPE = 'application/octet-stream'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Formato binario propio: cabecera fija + matriz float32 little-endian por filas
+# Petición:  magic b'VMLF', versión, n_columnas (las de feature_names), n_filas
+# Respuesta: magic b'VMLP', versión, n_columnas = 2, n_filas, seguido de
+#            probability_suitable (n float32) e is_suitable (n uint8)
+REQUEST_MAGIC = b'VMLF'
+RESPONSE_MAGIC = b'VMLP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+
+
+class BinaryFormatError(ValueError):
+    """Cuerpo binario con cabecera, tamaño o columnas incorrectos"""
+
+
+def arrow_available():
+    return pa is not None
+
+
+def decode_raw(body, n_features):
+    """Vista float32 (n, n_features) sobre el cuerpo de la petición, sin copiar"""
+    if len(body) < HEADER.size:
+        raise BinaryFormatError("Cuerpo demasiado corto para la cabecera")
+    magic, version, n_cols, n_rows = HEADER.unpack_from(body)
+    if magic != REQUEST_MAGIC or version != FORMAT_VERSION:
+        raise BinaryFormatError("Cabecera binaria no reconocida")
+    if n_cols != n_features:
+        raise BinaryFormatError(f"Se esperaban {n_features} columnas y se recibieron {n_cols}")
+    if len(body) != HEADER.size + n_rows * n_cols * 4:
+        raise BinaryFormatError("El tamaño del cuerpo no coincide con la cabecera")
+    return np.frombuffer(body, dtype='<f4', count=n_rows * n_cols, offset=HEADER.size).reshape(n_rows, n_cols)
+
+
+def encode_raw(labels, probability):
+    n = len(probability)
+    return b''.join([
+        HEADER.pack(RESPONSE_MAGIC, FORMAT_VERSION, 2, n),
+        np.asarray(probability, dtype='<f4').tobytes(),
+        np.asarray(labels, dtype=np.uint8).tobytes()
+    ])
+
+
+def decode_arrow(body, feature_names):
+    """Stream Arrow IPC con una columna por característica -> matriz (n, 11)"""
+    if pa is None:
+        raise BinaryFormatError("pyarrow no está instalado: usa application/octet-stream")
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise BinaryFormatError(f"Stream Arrow inválido: {e}")
+
+    missing = [name for name in feature_names if name not in table.column_names]
+    if missing:
+        raise BinaryFormatError(f"Faltan columnas: {', '.join(missing)}")
+
+    X = np.empty((table.num_rows, len(feature_names)), dtype=np.float64)
+    for i, name in enumerate(feature_names):
+        column = table.column(name)
+        if column.null_count:
+            raise BinaryFormatError(f"La columna {name} contiene nulos")
+        # to_numpy no copia si la columna es de un solo chunk; la única copia
+        # es la escritura (con conversión de tipo) en la matriz por filas
+        X[:, i] = column.to_numpy()
+    return X
+
+
+def encode_arrow(labels, probability):
+    batch = pa.record_batch([
+        pa.array(np.asarray(probability, dtype=np.float64)),
+        pa.array(np.asarray(labels, dtype=bool))
+    ], names=['probability_suitable', 'is_suitable'])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_request(body, content_type, feature_names):
+    """Devuelve (matriz, formato) según el Content-Type de la petición"""
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type == ARROW_MEDIA_TYPE:
+        return decode_arrow(body, feature_names), 'arrow'
+    if media_type == RAW_MEDIA_TYPE:
+        return decode_raw(body, len(feature_names)), 'raw'
+    raise BinaryFormatError(f"Content-Type no soportado: usa {RAW_MEDIA_TYPE} o {ARROW_MEDIA_TYPE}")
+
+
+def encode_response(label_chunks, probability_chunks, fmt):
+    """
+    Une los trozos de etiquetas y probabilidades y devuelve (cuerpo, media_type)
+    en el mismo formato que la petición
+    """
+    labels = np.concatenate(label_chunks) if label_chunks else np.empty(0, dtype=bool)
+    probability = np.concatenate(probability_chunks) if probability_chunks else np.empty(0)
+    if fmt == 'arrow':
+        return encode_arrow(labels, probability), ARROW_MEDIA_TYPE
+    return encode_raw(labels, probability), RAW_MEDIA_TYPE
+
+
+def pairs_to_matrix(pairs, feature_names):
+    """Matriz (n, 11) de características base a partir de pares (voluntario, proyecto)"""
+    return np.array([[{**v, **p}[name] for name in feature_names] for v, p in pairs], dtype=np.float64)
+
+
+def matrix_to_pairs(X, feature_names):
+    """Pares (voluntario, proyecto) para modelos sin predict_matrix"""
+    volunteer_names, project_names = feature_names[:8], feature_names[8:]
+    return [
+        (dict(zip(volunteer_names, row[:8])), dict(zip(project_names, row[8:])))
+        for row in np.asarray(X, dtype=np.float64).tolist()
+    ]
+
+
+def results_to_columns(results):
+    """Resultados de predict_batch -> (etiquetas, probabilidad); los errores quedan como NaN"""
+    labels = np.fromiter((result.get('is_suitable', False) for result in results), dtype=bool, count=len(results))
+    probability = np.fromiter(
+        (result.get('probability_suitable', np.nan) for result in results), dtype=np.float64, count=len(results)
+    )
+    return labels, probability
@@ -0,0 +1,45 @@
+import asyncio
+
+
+class RequestCoalescer:
+    """
+    Agrupa peticiones idénticas que llegan a la vez (single-flight)
+
+    La primera petición con una clave lanza el cálculo; las que
+    llegan mientras sigue en curso esperan el mismo resultado en lugar de
+    repetirlo. Al terminar, la clave se libera: no es una caché de resultados.
+    """
+    def __init__(self):
+        self._in_flight = {}
+        self.requests = 0
+        self.computations = 0
+        self.errors = 0
+
+    async def run(self, key, compute):
+        """Espera el resultado de la corrutina compute(), compartida por clave"""
+        self.requests += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.computations += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # shield: si un cliente se desconecta, el resto sigue esperando el cálculo
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        coalesced = self.requests - self.computations
+        return {
+            'requests': self.requests,
+            'computations': self.computations,
+            'coalesced': coalesced,
+            'coalescing_ratio': coalesced / self.requests if self.requests else 0.0,
+            'in_flight': len(self._in_flight),
+            'errors': self.errors
+        }
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+
+# Formato compacto del bosque: un directorio con header.json y arrays .npy
+# tipados que se abren con np.load(mmap_mode='r'). No requiere scikit-learn
+# para cargarse ni para predecir.
+FORMAT_NAME = 'volunteer-forest'
+FORMAT_VERSION = 1
+
+# Subdirectorio del modelo con el bosque compactado (podado y en float32,
+# ver pruning.py); si existe se carga en su lugar salvo con FOREST_ARTIFACT=sklearn
+PRUNED_DIR = 'compact_pruned'
+
+DERIVED_FEATURES = ['experience_score', 'performance_avg', 'availability_ratio', 'completion_rate']
+
+ARRAY_DTYPES = {
+    'feature': np.int16,
+    'threshold': np.float32,
+    'children_left': np.int32,
+    'children_right': np.int32,
+    'value': np.float64,
+    'roots': np.int32,
+    'scaler_mean': np.float64,
+    'scaler_scale': np.float64
+}
+
+
+def prepare_feature_matrix(records, feature_names):
+    """
+    Versión numpy de prepare_features: lista de dicts -> matriz (n, 15)
+    con las características base seguidas de las derivadas
+    """
+    X = np.array(
+        [[record.get(name, 0) for name in feature_names] for record in records],
+        dtype=np.float64
+    ).reshape(len(records), len(feature_names))
+    return add_derived_features(X, feature_names)
+
+
+def add_derived_features(X, feature_names):
+    """Añade las 4 características derivadas a una matriz de características base"""
+    col = {name: X[:, i] for i, name in enumerate(feature_names)}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = np.column_stack([
+            col['total_projects'] * 0.3 + col['total_hours'] * 0.002,
+            (col['reliability'] + col['punctuality'] + col['task_quality']) / 3,
+            np.minimum(col['availability_hours'] / col['required_hours'], 2),
+            col['completed_projects'] / np.maximum(col['total_projects'], 1)
+        ])
+    return np.hstack([X, derived])
+
+
+def _threshold_to_float32(threshold):
+    """
+    Redondea los umbrales hacia abajo a float32. Los árboles comparan la
+    entrada en float32, así que `x <= t` y `x <= t32` dan el mismo resultado.
+    """
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+
+def forest_arrays(forest, scaler, feature_names):
+    """
+    Arrays planos y cabecera del formato compacto para un
+    RandomForestClassifier y su StandardScaler (sin escribir a disco)
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left < 0
+
+        value = tree.value[:, 0, :].astype(np.float64)
+        value = value / value.sum(axis=1, keepdims=True)
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, -1, tree.feature))
+        thresholds.append(_threshold_to_float32(tree.threshold))
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+        values.append(value)
+        max_depth = max(max_depth, int(tree.max_depth))
+        offset += n
+
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children_left': np.concatenate(lefts),
+        'children_right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots),
+        'scaler_mean': np.asarray(scaler.mean_),
+        'scaler_scale': np.asarray(scaler.scale_)
+    }
+    header = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'created_at': time.time(),
+        'n_estimators': len(forest.estimators_),
+        'n_nodes': offset,
+        'max_depth': max_depth,
+        'classes': [int(c) for c in forest.classes_],
+        'feature_names': list(feature_names)
+    }
+    return arrays, header
+
+
+def export_forest(forest, scaler, feature_names, path, dtypes=None):
+    """
+    Exporta un RandomForestClassifier y su StandardScaler al formato compacto.
+    `dtypes` permite sobrescribir el tipo de algún array (p. ej. value=float32).
+    """
+    arrays, header = forest_arrays(forest, scaler, feature_names)
+    return write_compact(arrays, header, path, dtypes)
+
+
+def write_compact(arrays, header, path, dtypes=None):
+    """Escribe header y arrays en un directorio temporal y lo publica con rename"""
+    dtypes = {**ARRAY_DTYPES, **(dtypes or {})}
+    header = {**header, 'dtypes': {name: np.dtype(dtype).str for name, dtype in dtypes.items()}}
+
+    path = path.rstrip(os.sep)
+    tmp_path = f'{path}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name, dtype in dtypes.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(arrays[name], dtype=dtype))
+    with open(os.path.join(tmp_path, 'header.json'), 'w') as f:
+        json.dump(header, f, indent=2)
+
+    if os.path.exists(path):
+        old_path = f'{path}.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.rename(tmp_path, path)
+    return header
+
+
+def load_forest(path, mmap=True):
+    """Carga un bosque en formato compacto (mapeado en memoria por defecto)"""
+    with open(os.path.join(path, 'header.json'), 'r') as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT_NAME or header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Formato de modelo compacto no soportado en {path}")
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+        for name in ARRAY_DTYPES
+    }
+    return CompactForest(header, arrays)
+
+
+class CompactScaler:
+    """Equivalente de StandardScaler.transform a partir de media y escala"""
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+class CompactForest:
+    """
+    Bosque de decisión evaluado sobre arrays planos con numpy
+
+    Expone predict/predict_proba con la misma semántica que
+    RandomForestClassifier, de modo que puede ocupar el lugar de
+    `self.model` (y `scaler` el de `self.scaler`) en los modelos existentes.
+    """
+    def __init__(self, header, arrays):
+        self.header = header
+        self.feature_names = header['feature_names']
+        self.classes_ = np.array(header['classes'])
+        self.n_estimators = header['n_estimators']
+        self.max_depth = header['max_depth']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.scaler = CompactScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+
+    # A partir de este número de filas conviene recorrer árbol a árbol
+    # (arrays 1D contiguos) en lugar de todos los árboles a la vez
+    PER_TREE_MIN_ROWS = 1024
+
+    def _descend(self, X, nodes, rows):
+        """Baja `nodes` (un nodo por fila y árbol) hasta las hojas"""
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            is_leaf = feature < 0
+            if is_leaf.all():
+                break
+            go_left = X[rows, np.maximum(feature, 0)] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+            nodes = np.where(is_leaf, nodes, next_nodes)
+        return nodes
+
+    def apply(self, X):
+        """Índice global de la hoja alcanzada en cada árbol: (n_filas, n_árboles)"""
+        X = np.asarray(X, dtype=np.float32)
+        roots = np.asarray(self.roots)
+
+        if X.shape[0] < self.PER_TREE_MIN_ROWS:
+            nodes = np.repeat(roots[None, :], X.shape[0], axis=0)
+            return self._descend(X, nodes, np.arange(X.shape[0])[:, None])
+
+        leaves = np.empty((X.shape[0], len(roots)), dtype=np.intp)
+        rows = np.arange(X.shape[0])
+        for t, root in enumerate(roots):
+            leaves[:, t] = self._descend(X, np.full(X.shape[0], root, dtype=np.intp), rows)
+        return leaves
+
+    def predict_proba(self, X):
+        # Acumular árbol a árbol, en el mismo orden que RandomForestClassifier
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        for t in range(leaves.shape[1]):
+            proba += self.value[leaves[:, t]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,114 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from outcome_log import OUTCOME_COLUMNS, read_training_table
+
+# Tipos compactos de las columnas de entrenamiento (pandas usaría float64/int64)
+TRAINING_DTYPES = {
+    'reliability': np.float32,
+    'punctuality': np.float32,
+    'task_quality': np.float32,
+    'success_rate': np.float32,
+    'total_projects': np.int32,
+    'completed_projects': np.int32,
+    'total_hours': np.float32,
+    'availability_hours': np.float32,
+    'project_duration': np.float32,
+    'project_complexity': np.float32,
+    'required_hours': np.float32,
+    'is_suitable': np.int8
+}
+
+
+def load_training_data(data_path):
+    """
+    Carga un CSV de entrenamiento (o el conjunto columnar del log de
+    resultados) con los tipos compactos de TRAINING_DTYPES
+    """
+    if data_path.endswith('.npz') or os.path.isdir(data_path):
+        df = read_training_table(data_path)
+    else:
+        header = pd.read_csv(data_path, nrows=0).columns
+        df = pd.read_csv(data_path, dtype={name: dtype for name, dtype in TRAINING_DTYPES.items()
+                                           if name in header})
+    return df.astype({name: dtype for name, dtype in TRAINING_DTYPES.items() if name in df.columns})
+
+
+def _default_bytes(df):
+    """Memoria que ocuparía la tabla con los tipos por defecto de pandas (8 bytes por valor)"""
+    return int(df.shape[0] * df.shape[1] * 8 + df.index.memory_usage())
+
+
+def deduplicate(df):
+    """
+    Elimina filas exactamente repetidas (características y etiqueta) con un
+    hash vectorizado por fila. Devuelve (df_único, pesos): el peso de cada
+    fila es el número de veces que aparecía, así que la distribución de la
+    etiqueta ponderada es la original. Se conserva el orden de aparición.
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    _, first, inverse, counts = np.unique(hashes, return_index=True, return_inverse=True,
+                                          return_counts=True)
+
+    # Comprobar que cada fila coincide con la representante de su hash;
+    # ante una colisión (improbable con 64 bits) se agrupa de forma exacta
+    values = df.to_numpy(dtype=np.float64)
+    representative = values[first[inverse.reshape(-1)]]
+    same = (values == representative) | (np.isnan(values) & np.isnan(representative))
+    if not same.all():
+        groups = df.groupby(list(df.columns), sort=False, dropna=False)
+        first = np.flatnonzero(~groups.ngroup().duplicated().to_numpy())
+        counts = groups.size().to_numpy()
+        order = np.arange(len(first))
+    else:
+        order = np.argsort(first)
+
+    unique = df.iloc[first[order]].reset_index(drop=True)
+    return unique, counts[order].astype(np.float64)
+
+
+def prepare_training_data(data_path, dedup=True):
+    """
+    Etapa previa a train(): carga con tipos compactos y, si `dedup`,
+    deduplica con pesos. Devuelve (df, pesos o None, informe de ahorro);
+    los pesos son None si no había filas repetidas, de modo que el ajuste
+    es el mismo que sin deduplicar.
+    """
+    start = time.perf_counter()
+    df = load_training_data(data_path)
+    columns = [name for name in OUTCOME_COLUMNS if name in df.columns]
+    df = df[columns + [name for name in df.columns if name not in columns]]
+    rows_in = len(df)
+    default_bytes = _default_bytes(df)
+    compact_bytes = int(df.memory_usage(deep=True).sum())
+
+    weights = None
+    if dedup and rows_in:
+        unique, counts = deduplicate(df)
+        if len(unique) < rows_in:
+            df, weights = unique, counts
+
+    report = {
+        'data_path': data_path,
+        'rows_in': rows_in,
+        'rows_out': int(len(df)),
+        'duplicates_removed': rows_in - int(len(df)),
+        'default_bytes': default_bytes,
+        'compact_bytes': compact_bytes,
+        'final_bytes': int(df.memory_usage(deep=True).sum()),
+        'positive_rate': float(np.average(df['is_suitable'], weights=weights)) if len(df) else None,
+        'seconds': time.perf_counter() - start
+    }
+    report['memory_ratio'] = report['final_bytes'] / default_bytes if default_bytes else None
+    return df, weights, report
+
+
+def format_report(report):
+    """Resumen de una línea para la salida de train()"""
+    return (f"Datos: {report['rows_in']} filas -> {report['rows_out']} "
+            f"({report['duplicates_removed']} duplicados), memoria "
+            f"{report['default_bytes'] / 1e6:.2f} MB -> {report['final_bytes'] / 1e6:.2f} MB "
+            f"en {report['seconds']:.2f}s")
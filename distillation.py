@@ -0,0 +1,167 @@
+import os
+import time
+import numpy as np
+import joblib
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.linear_model import Ridge
+
+from compact_forest import add_derived_features, prepare_feature_matrix
+from outcome_log import read_training_table
+
+STUDENT_KINDS = ('tree', 'logistic')
+
+
+class StudentModel:
+    """
+    Modelo compacto destilado del bosque (nivel rápido)
+
+    Aprende las probabilidades `predict_proba` del bosque sobre las mismas 15
+    características escaladas. Predice sin pandas: las características se
+    construyen con numpy y el escalado se aplica con media/escala.
+    """
+    def __init__(self, kind, estimator, scaler_mean, scaler_scale, feature_names, teacher_version=None):
+        self.kind = kind
+        self.estimator = estimator
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self.feature_names = list(feature_names)
+        self.teacher_version = teacher_version
+        self.is_trained = True
+        self.report = None
+
+        if kind == 'logistic':
+            # Coeficientes en arrays planos: la predicción es un producto escalar
+            self._coef = np.asarray(estimator.coef_, dtype=np.float64)
+            self._intercept = float(estimator.intercept_)
+
+    def _transform(self, X):
+        return (X - self.scaler_mean) / self.scaler_scale
+
+    def predict_proba_matrix(self, X_scaled):
+        """Probabilidad de ser adecuado para una matriz ya escalada"""
+        if self.kind == 'logistic':
+            return 1.0 / (1.0 + np.exp(-(X_scaled @ self._coef + self._intercept)))
+        return np.clip(self.estimator.predict(X_scaled), 0.0, 1.0)
+
+    def _results(self, probability):
+        return [
+            {'is_suitable': p > 0.5, 'confidence': max(p, 1.0 - p), 'probability_suitable': p}
+            for p in probability.tolist()
+        ]
+
+    def predict(self, volunteer_data, project_data):
+        return self.predict_batch([(volunteer_data, project_data)])[0]
+
+    def predict_batch(self, pairs):
+        X = prepare_feature_matrix([{**v, **p} for v, p in pairs], self.feature_names)
+        return self._results(self.predict_proba_matrix(self._transform(X)))
+
+    def predict_matrix(self, X):
+        """Etiquetas y probabilidad para una matriz (n, 11) de características base"""
+        X = add_derived_features(np.asarray(X, dtype=np.float64), self.feature_names)
+        probability = self.predict_proba_matrix(self._transform(X))
+        return probability > 0.5, probability
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp'
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+def _latency(predict_one, predict_many, pairs, repeats=200):
+    """Latencia media de una predicción individual y throughput por lotes"""
+    start = time.perf_counter()
+    for i in range(repeats):
+        predict_one(*pairs[i % len(pairs)])
+    single_ms = 1000 * (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    predict_many(pairs)
+    batch_seconds = time.perf_counter() - start
+    return {'single_ms': single_ms, 'batch_rows_per_second': len(pairs) / batch_seconds}
+
+
+def distill_student(teacher, n_samples=20000, kind='tree', max_depth=6,
+                    holdout_path=None, teacher_version=None, seed=42, n_holdout=2000):
+    """
+    Entrena un modelo compacto sobre las probabilidades del bosque `teacher`
+    evaluadas en una muestra sintética grande de generate_data.py.
+
+    Devuelve (student, report) con accuracy y latencia frente al teacher,
+    medidas sobre `holdout_path` o, por defecto, sobre `n_holdout` filas
+    etiquetadas de generate_data.py con otra semilla, que ni el teacher ni
+    el student han visto (los datos de entrenamiento del teacher darían una
+    accuracy del teacher inflada).
+    """
+    if kind not in STUDENT_KINDS:
+        raise ValueError(f"Tipo de modelo destilado no soportado: {kind}")
+    if not teacher.is_trained:
+        raise ValueError("El modelo teacher no está entrenado")
+
+    from generate_data import generate_training_data
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    synthetic = generate_training_data(n_samples, seed=rng)
+    X_scaled = teacher.scaler.transform(teacher.prepare_features(synthetic))
+    soft_labels = teacher.model.predict_proba(X_scaled)[:, 1]
+
+    if kind == 'logistic':
+        # Regresión sobre el logit de la probabilidad del teacher
+        clipped = np.clip(soft_labels, 1e-3, 1 - 1e-3)
+        estimator = Ridge(alpha=1.0).fit(X_scaled, np.log(clipped / (1 - clipped)))
+    else:
+        estimator = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=5, random_state=42)
+        estimator.fit(X_scaled, soft_labels)
+    distill_seconds = time.perf_counter() - start
+
+    student = StudentModel(
+        kind, estimator, teacher.scaler.mean_, teacher.scaler.scale_,
+        teacher.feature_names, teacher_version=teacher_version
+    )
+
+    # Evaluación sobre datos etiquetados que el teacher no vio al entrenar
+    if holdout_path is None:
+        holdout = generate_training_data(n_holdout, seed=rng)
+    else:
+        holdout = read_training_table(holdout_path)
+    labels = holdout['is_suitable'].to_numpy()
+    # Las 8 primeras características son del voluntario y las 3 últimas del proyecto
+    pairs = [
+        ({k: row[k] for k in teacher.feature_names[:8]}, {k: row[k] for k in teacher.feature_names[8:]})
+        for row in holdout.to_dict('records')
+    ]
+
+    def teacher_batch(batch_pairs):
+        return teacher.model.predict_proba(teacher.scale_pairs(batch_pairs))[:, 1]
+
+    teacher_proba = teacher_batch(pairs)
+    student_proba = student.predict_proba_matrix(student._transform(
+        prepare_feature_matrix(holdout.to_dict('records'), student.feature_names)))
+
+    report = {
+        'kind': kind,
+        'n_samples': n_samples,
+        'distill_seconds': distill_seconds,
+        'holdout_path': holdout_path,
+        'holdout_rows': len(holdout),
+        'teacher': {
+            'accuracy': float(((teacher_proba > 0.5) == labels).mean()),
+            **_latency(teacher.predict, teacher_batch, pairs)
+        },
+        'student': {
+            'accuracy': float(((student_proba > 0.5) == labels).mean()),
+            **_latency(student.predict, student.predict_batch, pairs)
+        },
+        'agreement': float(((student_proba > 0.5) == (teacher_proba > 0.5)).mean()),
+        'mean_abs_probability_diff': float(np.abs(student_proba - teacher_proba).mean())
+    }
+    student.report = report
+
+    print(f"✅ Modelo destilado ({kind}): accuracy {report['student']['accuracy']:.4f} "
+          f"(teacher {report['teacher']['accuracy']:.4f}), acuerdo {report['agreement']:.4f}")
+    return student, report
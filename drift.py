@@ -0,0 +1,172 @@
+import threading
+from operator import itemgetter
+
+import numpy as np
+
+from compact_forest import DERIVED_FEATURES, add_derived_features
+
+DRIFT_BINS = 10
+
+# Umbrales habituales del PSI (population stability index)
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+def _histogram(values, edges, weights=None):
+    """Conteos por intervalo; los valores fuera de rango caen en los extremos"""
+    return np.bincount(np.searchsorted(edges, values, side='right'), weights=weights, minlength=len(edges) + 1)
+
+
+def _quantiles(values, q, weights=None):
+    """
+    Cuantiles con interpolación lineal, como np.quantile (que en numpy 1.24 no
+    admite pesos). Con pesos enteros (filas deduplicadas) el resultado es el
+    de np.quantile sobre las filas originales repetidas.
+    """
+    if weights is None:
+        return np.quantile(values, q)
+    order = np.argsort(values, kind='stable')
+    values, cumulative = values[order], np.cumsum(weights[order])
+    position = (cumulative[-1] - 1) * np.asarray(q, dtype=np.float64)
+    low = np.floor(position)
+
+    def value_at(k):
+        # Valor de la fila k-ésima de la muestra expandida
+        return values[np.minimum(np.searchsorted(cumulative, k, side='right'), len(values) - 1)]
+
+    return value_at(low) + (position - low) * (value_at(low + 1) - value_at(low))
+
+
+def build_reference(X, feature_names, n_bins=DRIFT_BINS, weights=None):
+    """
+    Histogramas de referencia de las características preparadas (base +
+    derivadas) con bordes en los cuantiles del conjunto de entrenamiento.
+    `weights` (filas deduplicadas, ver data_prep.py) pondera bordes y conteos.
+    Devuelve un dict serializable que se guarda en los metadatos del modelo.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+    features = []
+    for i, name in enumerate(feature_names):
+        column = X[:, i]
+        finite = np.isfinite(column)
+        quantiles = _quantiles(column[finite], np.linspace(0, 1, n_bins + 1)[1:-1],
+                               None if weights is None else weights[finite]) if finite.any() else []
+        edges = np.unique(quantiles)
+        features.append({
+            'name': name,
+            'edges': edges.tolist(),
+            'counts': _histogram(column, edges, weights).tolist()
+        })
+    n_rows = float(np.sum(weights)) if weights is not None else len(X)
+    return {'n_rows': int(n_rows), 'n_bins': n_bins, 'features': features}
+
+
+def psi(expected, actual, epsilon=1e-4):
+    """PSI entre dos histogramas con los mismos intervalos"""
+    p = np.maximum(np.asarray(expected, dtype=np.float64) / max(np.sum(expected), 1), epsilon)
+    q = np.maximum(np.asarray(actual, dtype=np.float64) / max(np.sum(actual), 1), epsilon)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def _status(value):
+    if value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+class DriftMonitor:
+    """
+    Histogramas en streaming de las entradas en vivo, comparados con los de
+    referencia del modelo
+
+    Las filas se acumulan en un buffer y se añaden a los histogramas de forma
+    vectorizada cada `flush_rows` filas. La memoria es fija: un histograma por
+    característica. Cuando la ventana supera `window_rows` filas los conteos se
+    reducen a la mitad, de modo que pesan más las entradas recientes.
+
+    Con menos de `min_rows` filas en la ventana el PSI es sobre todo ruido
+    (unas pocas peticiones iguales ya darían "significant"), así que scores()
+    devuelve 'insufficient_data' sin estado por característica.
+    """
+    def __init__(self, reference, feature_names, window_rows=50000, flush_rows=256, min_rows=500):
+        self.reference = reference
+        self.feature_names = list(feature_names)
+        self.window_rows = window_rows
+        self.min_rows = min_rows
+        self.flush_rows = flush_rows
+        self._volunteer_values = itemgetter(*self.feature_names[:8])
+        self._project_values = itemgetter(*self.feature_names[8:])
+
+        # Posición de cada característica de referencia en la matriz preparada
+        columns = self.feature_names + DERIVED_FEATURES
+        self._features = [
+            (feature['name'], columns.index(feature['name']), np.asarray(feature['edges']),
+             np.asarray(feature['counts']))
+            for feature in reference['features'] if feature['name'] in columns
+        ]
+        self._counts = [np.zeros(len(edges) + 1) for _, _, edges, _ in self._features]
+        self._buffer = []
+        self._window = 0.0
+        self.rows_observed = 0
+        self._lock = threading.Lock()
+
+    def observe_pairs(self, pairs):
+        """Registra pares (voluntario, proyecto); se procesan por bloques"""
+        rows = [self._volunteer_values(v) + self._project_values(p) for v, p in pairs]
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.flush_rows:
+                self._flush()
+
+    def observe_matrix(self, X):
+        """Registra una matriz (n, 11) de características base"""
+        with self._lock:
+            self._update(np.asarray(X, dtype=np.float64))
+
+    def _flush(self):
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            self._update(np.array(rows, dtype=np.float64))
+
+    def _update(self, X_base):
+        if not len(X_base):
+            return
+        X = add_derived_features(X_base, self.feature_names)
+        for counts, (_, index, edges, _) in zip(self._counts, self._features):
+            counts += _histogram(X[:, index], edges)
+        self.rows_observed += len(X)
+        self._window += len(X)
+        if self._window > self.window_rows:
+            for counts in self._counts:
+                counts *= 0.5
+            self._window *= 0.5
+
+    def scores(self):
+        """PSI por característica frente a la referencia del modelo"""
+        with self._lock:
+            self._flush()
+            features = {
+                name: {'psi': psi(reference_counts, counts), 'status': None}
+                for counts, (name, _, _, reference_counts) in zip(self._counts, self._features)
+            }
+            window = self._window
+
+        if not window:
+            return {'status': 'no_data', 'rows_observed': self.rows_observed, 'features': {}}
+        if window < self.min_rows:
+            return {'status': 'insufficient_data', 'rows_observed': self.rows_observed, 'window_rows': window,
+                    'min_rows': self.min_rows, 'features': {}}
+        for feature in features.values():
+            feature['status'] = _status(feature['psi'])
+        max_psi = max((feature['psi'] for feature in features.values()), default=0.0)
+        return {
+            'status': _status(max_psi),
+            'max_psi': max_psi,
+            'rows_observed': self.rows_observed,
+            'window_rows': window,
+            'reference_rows': self.reference['n_rows'],
+            'features': features
+        }
@@ -0,0 +1,167 @@
+import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+CALIBRATION_BINS = 10
+
+# Matriz de características y etiquetas de cada proceso worker: se reciben una
+# sola vez al arrancar el proceso, no con cada pliegue
+_worker_data = None
+
+
+def _init_worker(X, y, weights):
+    global _worker_data
+    _worker_data = (X, y, weights)
+
+
+def _run_fold(task):
+    return _fit_fold(*_worker_data, *task)
+
+
+def _fit_fold(X, y, weights, estimator, fold, train_index, test_index):
+    """Escala y entrena sobre el pliegue de entrenamiento y puntúa el de prueba"""
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    estimator = clone(estimator)
+    train_weights = weights[train_index] if weights is not None else None
+    estimator.fit(scaler.fit_transform(X[train_index], sample_weight=train_weights), y[train_index],
+                  sample_weight=train_weights)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proba = estimator.predict_proba(scaler.transform(X[test_index]))
+    probability = proba[:, list(estimator.classes_).index(1)]
+    predict_seconds = time.perf_counter() - start
+
+    y_test = y[test_index]
+    test_weights = weights[test_index] if weights is not None else None
+    metrics = {
+        'fold': fold,
+        'n_train': int(len(train_index)),
+        'n_test': int(len(test_index)),
+        'accuracy': float(accuracy_score(y_test, probability > 0.5, sample_weight=test_weights)),
+        'roc_auc': float(roc_auc_score(y_test, probability, sample_weight=test_weights)),
+        'brier': float(np.average((probability - y_test) ** 2, weights=test_weights)),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds
+    }
+    return metrics, test_index, probability
+
+
+def calibration(y, probability, n_bins=CALIBRATION_BINS, weights=None):
+    """
+    Brier, error de calibración esperado (ECE) y curva de fiabilidad en
+    intervalos de probabilidad de igual anchura
+    """
+    weights = np.ones(len(y)) if weights is None else weights
+    bins = np.minimum((probability * n_bins).astype(int), n_bins - 1)
+    curve = []
+    ece = 0.0
+    for b in range(n_bins):
+        mask = bins == b
+        count = float(weights[mask].sum())
+        if not count:
+            continue
+        mean_predicted = float(np.average(probability[mask], weights=weights[mask]))
+        observed_rate = float(np.average(y[mask], weights=weights[mask]))
+        ece += count / weights.sum() * abs(mean_predicted - observed_rate)
+        curve.append({
+            'bin': [b / n_bins, (b + 1) / n_bins],
+            'count': count,
+            'mean_predicted': mean_predicted,
+            'observed_rate': observed_rate
+        })
+    brier = float(np.average((probability - y) ** 2, weights=weights))
+    return {'brier': brier, 'ece': float(ece), 'curve': curve}
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {'mean': float(values.mean()), 'std': float(values.std()), 'min': float(values.min()),
+            'max': float(values.max())}
+
+
+def default_workers(n_splits):
+    return max(1, min(n_splits, os.cpu_count() or 1))
+
+
+def cross_validate(estimator, X, y, n_splits=5, n_workers=None, random_state=42, sample_weight=None):
+    """
+    Validación cruzada estratificada de `estimator` sobre la matriz de
+    características ya preparada `X` (sin escalar: cada pliegue ajusta su
+    propio escalador, como train()). Con `sample_weight` (filas
+    deduplicadas) el ajuste y las métricas se ponderan.
+
+    Los pliegues se reparten en un pool de procesos; la matriz se envía a cada
+    worker una sola vez. Con un solo worker se evalúan en el propio proceso.
+    Devuelve un dict serializable en JSON con las métricas por pliegue, su
+    media y las métricas fuera de pliegue (accuracy, ROC-AUC y calibración).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y).astype(int)
+    weights = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+    min_class = int(np.bincount(y).min()) if len(np.unique(y)) > 1 else 0
+    n_splits = min(n_splits, min_class)
+    if n_splits < 2:
+        raise ValueError("La validación cruzada requiere al menos 2 ejemplos de cada clase")
+    n_workers = min(n_workers or default_workers(n_splits), n_splits)
+
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    tasks = [(estimator, fold, train_index, test_index)
+             for fold, (train_index, test_index) in enumerate(splitter.split(X, y))]
+
+    start = time.perf_counter()
+    if n_workers == 1:
+        results = [_fit_fold(X, y, weights, *task) for task in tasks]
+    else:
+        # spawn, como el pool de inferencia: el proceso de la API tiene hilos
+        with ProcessPoolExecutor(n_workers, mp_context=mp.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(X, y, weights)) as executor:
+            results = list(executor.map(_run_fold, tasks))
+    cv_seconds = time.perf_counter() - start
+
+    folds = []
+    out_of_fold = np.empty(len(y), dtype=np.float64)
+    for metrics, test_index, probability in results:
+        folds.append(metrics)
+        out_of_fold[test_index] = probability
+
+    return {
+        'method': 'stratified_kfold',
+        'n_splits': n_splits,
+        'n_workers': n_workers,
+        'n_samples': int(len(y)),
+        'n_weighted': float(weights.sum()) if weights is not None else float(len(y)),
+        'positive_rate': float(np.average(y, weights=weights)),
+        'accuracy': _summary([fold['accuracy'] for fold in folds]),
+        'roc_auc': _summary([fold['roc_auc'] for fold in folds]),
+        'brier': _summary([fold['brier'] for fold in folds]),
+        'out_of_fold': {
+            'accuracy': float(accuracy_score(y, out_of_fold > 0.5, sample_weight=weights)),
+            'roc_auc': float(roc_auc_score(y, out_of_fold, sample_weight=weights)),
+            'calibration': calibration(y, out_of_fold, weights=weights)
+        },
+        'folds': folds,
+        'timings': {
+            'cv_seconds': cv_seconds,
+            'fit_seconds': sum(fold['fit_seconds'] for fold in folds),
+            'predict_seconds': sum(fold['predict_seconds'] for fold in folds)
+        }
+    }
+
+
+def format_summary(evaluation):
+    """Resumen de una línea para la salida de train()"""
+    return (f"CV {evaluation['n_splits']} pliegues ({evaluation['n_workers']} procesos): "
+            f"accuracy {evaluation['accuracy']['mean']:.4f} ± {evaluation['accuracy']['std']:.4f}, "
+            f"ROC-AUC {evaluation['roc_auc']['mean']:.4f} ± {evaluation['roc_auc']['std']:.4f}, "
+            f"ECE {evaluation['out_of_fold']['calibration']['ece']:.4f} "
+            f"en {evaluation['timings']['cv_seconds']:.2f}s")
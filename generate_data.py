@@ -1,46 +1,45 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 
-# Establecer semilla para reproducibilidad
-np.random.seed(42)
-random.seed(42)
-
-def generate_training_data(n_samples=1000):
+def generate_training_data(n_samples=1000, seed=None):
     """
     Genera datos sintéticos de entrenamiento basados en el modelo Volunteer.js
+
+    `seed` es una semilla o un np.random.Generator; se usa un generador
+    propio, sin tocar el estado aleatorio global.
     """
+    rng = np.random.default_rng(seed)
     data = []
     
     for i in range(n_samples):
         # Crear diferentes tipos de voluntarios
-        volunteer_type = np.random.choice(['excellent', 'good', 'average', 'poor'], 
+        volunteer_type = rng.choice(['excellent', 'good', 'average', 'poor'], 
                                          p=[0.2, 0.3, 0.3, 0.2])
         
         if volunteer_type == 'excellent':
-            reliability = np.random.normal(8.5, 1.0)
-            punctuality = np.random.normal(8.5, 1.0)
-            task_quality = np.random.normal(8.5, 1.0)
-            total_projects = np.random.poisson(15) + 5
+            reliability = rng.normal(8.5, 1.0)
+            punctuality = rng.normal(8.5, 1.0)
+            task_quality = rng.normal(8.5, 1.0)
+            total_projects = rng.poisson(15) + 5
             success_rate_base = 0.9
         elif volunteer_type == 'good':
-            reliability = np.random.normal(7.0, 1.2)
-            punctuality = np.random.normal(7.2, 1.2)
-            task_quality = np.random.normal(7.0, 1.2)
-            total_projects = np.random.poisson(8) + 2
+            reliability = rng.normal(7.0, 1.2)
+            punctuality = rng.normal(7.2, 1.2)
+            task_quality = rng.normal(7.0, 1.2)
+            total_projects = rng.poisson(8) + 2
             success_rate_base = 0.8
         elif volunteer_type == 'average':
-            reliability = np.random.normal(5.5, 1.5)
-            punctuality = np.random.normal(6.0, 1.5)
-            task_quality = np.random.normal(5.8, 1.5)
-            total_projects = np.random.poisson(5)
+            reliability = rng.normal(5.5, 1.5)
+            punctuality = rng.normal(6.0, 1.5)
+            task_quality = rng.normal(5.8, 1.5)
+            total_projects = rng.poisson(5)
             success_rate_base = 0.6
         else:  # poor
-            reliability = np.random.normal(3.5, 1.8)
-            punctuality = np.random.normal(4.0, 1.8)
-            task_quality = np.random.normal(4.0, 1.8)
-            total_projects = np.random.poisson(2)
+            reliability = rng.normal(3.5, 1.8)
+            punctuality = rng.normal(4.0, 1.8)
+            task_quality = rng.normal(4.0, 1.8)
+            total_projects = rng.poisson(2)
             success_rate_base = 0.3
         
         # Limitar valores a rangos válidos
@@ -49,15 +48,15 @@ def generate_training_data(n_samples=1000):
         task_quality = max(0, min(10, task_quality))
         
         # Experiencia
-        completed_projects = int(total_projects * np.random.uniform(success_rate_base-0.2, success_rate_base+0.1))
+        completed_projects = int(total_projects * rng.uniform(success_rate_base-0.2, success_rate_base+0.1))
         completed_projects = max(0, min(completed_projects, total_projects))
-        total_hours = np.random.exponential(50) + (total_projects * 8)
+        total_hours = rng.exponential(50) + (total_projects * 8)
         
         # Disponibilidad varía según tipo
         if volunteer_type in ['excellent', 'good']:
-            availability_hours = np.random.uniform(15, 40)
+            availability_hours = rng.uniform(15, 40)
         else:
-            availability_hours = np.random.uniform(5, 25)
+            availability_hours = rng.uniform(5, 25)
         
         # Calcular success_rate real
         if total_projects > 0:
@@ -66,9 +65,9 @@ def generate_training_data(n_samples=1000):
             success_rate = 0
             
         # Datos del proyecto (simulados)
-        project_duration = np.random.uniform(1, 12)  # semanas
-        project_complexity = np.random.uniform(1, 10)  # 1-10
-        required_hours = np.random.uniform(10, 60)  # horas requeridas        # Calcular si es adecuado (variable objetivo)
+        project_duration = rng.uniform(1, 12)  # semanas
+        project_complexity = rng.uniform(1, 10)  # 1-10
+        required_hours = rng.uniform(10, 60)  # horas requeridas        # Calcular si es adecuado (variable objetivo)
         # Lógica mejorada: voluntario es adecuado si tiene buenas métricas Y disponibilidad
         score = (
             reliability * 0.3 + 
@@ -118,8 +117,8 @@ def generate_training_data(n_samples=1000):
     return pd.DataFrame(data)
 
 if __name__ == "__main__":
-    # Generar datos de entrenamiento
-    df = generate_training_data(1000)
+    # Generar datos de entrenamiento (semilla fija para reproducibilidad)
+    df = generate_training_data(1000, seed=42)
     
     # Guardar datos
     df.to_csv('data/training_data.csv', index=False)
@@ -0,0 +1,218 @@
+import os
+import threading
+import multiprocessing as mp
+from operator import itemgetter
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from outcome_log import OUTCOME_COLUMNS
+
+# Columnas base de la matriz compartida, en el orden de feature_names
+BASE_COLUMNS = OUTCOME_COLUMNS[:11]
+_volunteer_values = itemgetter(*BASE_COLUMNS[:8])
+_project_values = itemgetter(*BASE_COLUMNS[8:])
+
+
+def _attach(name):
+    """Abre un segmento creado por el proceso principal sin hacerse cargo de él"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: el resource_tracker del worker lo borraría al salir
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _load_model(model_dir):
+    from ml_model import VolunteerMLModel
+
+    model = VolunteerMLModel()
+    if not model.load_model(model_dir):
+        raise RuntimeError(f"No se pudo cargar el modelo desde {model_dir}")
+    return model
+
+
+def _score_slice(model, task):
+    """Puntúa las filas [start, end) de la matriz compartida y escribe el resultado en su sitio"""
+    buffers = {key: _attach(task[key]) for key in ('X', 'labels', 'proba')}
+    try:
+        n, start, end, n_classes = task['n_rows'], task['start'], task['end'], task['n_classes']
+        X = np.ndarray((n, len(BASE_COLUMNS)), dtype=np.float64, buffer=buffers['X'].buf)
+        labels = np.ndarray((n,), dtype=np.int8, buffer=buffers['labels'].buf)
+        proba = np.ndarray((n, n_classes), dtype=np.float64, buffer=buffers['proba'].buf)
+
+        slice_labels, slice_proba = model._label_scaled(model.scale_matrix(X[start:end]))
+
+        labels[start:end] = np.asarray(slice_labels, dtype=np.int8)
+        proba[start:end] = slice_proba
+        del X, labels, proba
+    finally:
+        for shm in buffers.values():
+            shm.close()
+
+
+def _worker_main(conn, model_dir):
+    """Bucle de un worker: carga el modelo una vez y atiende órdenes por su pipe"""
+    try:
+        model = _load_model(model_dir)
+        conn.send(('ready', os.getpid()))
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+
+    while True:
+        command, payload = conn.recv()
+        try:
+            if command == 'stop':
+                break
+            if command == 'load':
+                model = _load_model(payload)
+                conn.send(('ready', os.getpid()))
+            elif command == 'predict':
+                _score_slice(model, payload)
+                conn.send(('done', payload['end'] - payload['start']))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+class InferencePool:
+    """
+    Procesos worker que cargan el modelo una vez y puntúan matrices grandes
+
+    La matriz de características base (n, 11) se escribe una sola vez en un
+    segmento de memoria compartida; cada worker puntúa un rango de filas y
+    escribe etiquetas y probabilidades en otros dos segmentos compartidos.
+    Por los pipes solo viajan nombres de segmentos e índices, nunca datos.
+    """
+    def __init__(self, n_workers=None, min_rows=20000):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self.model_dir = None
+        self.rows_scored = 0
+        self.calls = 0
+        self._ctx = mp.get_context('spawn')
+        self._workers = []
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    def start(self, model_dir):
+        with self._lock:
+            if self._workers:
+                return
+            for _ in range(self.n_workers):
+                parent_conn, child_conn = self._ctx.Pipe()
+                process = self._ctx.Process(target=_worker_main, args=(child_conn, model_dir), daemon=True)
+                process.start()
+                child_conn.close()
+                self._workers.append((process, parent_conn))
+            self.model_dir = model_dir
+            self._collect('arrancar el pool de inferencia')
+        print(f"✅ Pool de inferencia iniciado ({self.n_workers} procesos)")
+
+    def load(self, model_dir):
+        """Carga en todos los workers el modelo de `model_dir` (tras promover una versión)"""
+        with self._lock:
+            if not self._workers:
+                return
+            for _, conn in self._workers:
+                conn.send(('load', model_dir))
+            self.model_dir = model_dir
+            self._collect('cargar el modelo en el pool')
+
+    @staticmethod
+    def _recv(conn):
+        try:
+            return conn.recv()
+        except EOFError:
+            return ('error', 'el proceso worker terminó inesperadamente')
+
+    def _collect(self, action):
+        replies = [self._recv(conn) for _, conn in self._workers]
+        errors = [payload for status, payload in replies if status == 'error']
+        if errors:
+            raise RuntimeError(f"Error al {action}: {errors[0]}")
+        return replies
+
+    def should_use(self, n_rows):
+        return self.running and n_rows >= self.min_rows
+
+    def predict_pairs(self, pairs, n_classes=2, model_dir=None):
+        """(etiquetas, probabilidades) para una lista de pares (voluntario, proyecto)"""
+        return self.predict_matrix([_volunteer_values(v) + _project_values(p) for v, p in pairs], n_classes,
+                                   model_dir=model_dir)
+
+    def predict_matrix(self, X, n_classes=2, model_dir=None):
+        """
+        (etiquetas, probabilidades) para una matriz (n, 11) de características
+        base. Con `model_dir`, falla si los workers tienen cargado otro modelo
+        (p. ej. durante un cambio de versión) en lugar de puntuar con él.
+        """
+        n = len(X)
+        buffers = {
+            'X': shared_memory.SharedMemory(create=True, size=max(n * len(BASE_COLUMNS) * 8, 1)),
+            'labels': shared_memory.SharedMemory(create=True, size=max(n, 1)),
+            'proba': shared_memory.SharedMemory(create=True, size=max(n * n_classes * 8, 1))
+        }
+        try:
+            X_shared = np.ndarray((n, len(BASE_COLUMNS)), dtype=np.float64, buffer=buffers['X'].buf)
+            X_shared[:] = X
+            del X_shared
+
+            bounds = np.linspace(0, n, min(self.n_workers, n) + 1).astype(int)
+            with self._lock:
+                if not self._workers:
+                    raise RuntimeError("El pool de inferencia no está iniciado")
+                if model_dir is not None and model_dir != self.model_dir:
+                    raise RuntimeError(f"El pool tiene cargado {self.model_dir}, no {model_dir}")
+                workers = self._workers[:len(bounds) - 1]
+                for (_, conn), start, end in zip(workers, bounds[:-1], bounds[1:]):
+                    conn.send(('predict', {
+                        'X': buffers['X'].name, 'labels': buffers['labels'].name,
+                        'proba': buffers['proba'].name, 'n_rows': n, 'n_classes': n_classes,
+                        'start': int(start), 'end': int(end)
+                    }))
+                replies = [self._recv(conn) for _, conn in workers]
+            errors = [payload for status, payload in replies if status == 'error']
+            if errors:
+                raise RuntimeError(f"Error en el pool de inferencia: {errors[0]}")
+
+            labels = np.ndarray((n,), dtype=np.int8, buffer=buffers['labels'].buf).copy()
+            proba = np.ndarray((n, n_classes), dtype=np.float64, buffer=buffers['proba'].buf).copy()
+            self.calls += 1
+            self.rows_scored += n
+            return labels, proba
+        finally:
+            for shm in buffers.values():
+                shm.close()
+                shm.unlink()
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'workers': self.n_workers,
+            'min_rows': self.min_rows,
+            'model_dir': self.model_dir,
+            'calls': self.calls,
+            'rows_scored': self.rows_scored
+        }
+
+    def stop(self):
+        with self._lock:
+            for process, conn in self._workers:
+                try:
+                    conn.send(('stop', None))
+                except (BrokenPipeError, OSError):
+                    pass
+            for process, conn in self._workers:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                conn.close()
+            self._workers = []
@@ -0,0 +1,259 @@
+import os
+import csv
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from itertools import islice
+
+from outcome_log import OUTCOME_COLUMNS
+
+# Columnas de entrada de un trabajo: las 11 características (sin etiqueta)
+VOLUNTEER_COLUMNS = OUTCOME_COLUMNS[:8]
+PROJECT_COLUMNS = OUTCOME_COLUMNS[8:11]
+JOB_FORMATS = ('csv', 'ndjson')
+FINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    uploaded INTEGER NOT NULL,
+    tier TEXT,
+    model_version TEXT,
+    total_rows INTEGER NOT NULL,
+    completed_rows INTEGER NOT NULL DEFAULT 0,
+    failed_rows INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    is_suitable INTEGER,
+    confidence REAL,
+    probability_suitable REAL,
+    error TEXT,
+    PRIMARY KEY (job_id, row)
+) WITHOUT ROWID;
+"""
+
+
+def detect_format(path, fmt=None):
+    """Formato explícito o deducido de la extensión (.csv / .ndjson / .jsonl)"""
+    if fmt is None:
+        fmt = 'csv' if path.endswith('.csv') else 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else None
+    if fmt not in JOB_FORMATS:
+        raise ValueError(f"Formato no soportado: usa uno de {', '.join(JOB_FORMATS)}")
+    return fmt
+
+
+def _to_pair(record):
+    """Registro plano o {'volunteer': ..., 'project': ...} -> (voluntario, proyecto)"""
+    if not isinstance(record, dict):
+        raise ValueError("no es un objeto JSON válido")
+    if 'volunteer' in record and 'project' in record:
+        volunteer, project = record['volunteer'], record['project']
+    else:
+        volunteer, project = record, record
+    return (
+        {name: float(volunteer[name]) for name in VOLUNTEER_COLUMNS},
+        {name: float(project[name]) for name in PROJECT_COLUMNS}
+    )
+
+
+def _records(path, fmt):
+    """Itera los registros del archivo; una línea inválida produce None"""
+    with open(path, 'r', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def iter_chunks(path, fmt, start_row, chunk_size):
+    """
+    Lee el archivo desde `start_row` en trozos de (fila_inicial, pares, errores).
+    `errores` asocia la posición en el trozo de las filas inválidas a su mensaje;
+    esas filas aparecen en `pares` como None.
+    """
+    records = islice(_records(path, fmt), start_row, None)
+    row = start_row
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        pairs, errors = [], {}
+        for i, record in enumerate(chunk):
+            try:
+                pairs.append(_to_pair(record))
+            except (KeyError, TypeError, ValueError) as e:
+                pairs.append(None)
+                errors[i] = f"Fila inválida: {e!r}"
+        yield row, pairs, errors
+        row += len(chunk)
+
+
+class JobStore:
+    """
+    Trabajos de puntuación masiva persistidos en SQLite
+
+    Cada trozo puntuado se guarda junto con el avance del trabajo en una
+    misma transacción, así que tras un reinicio el trabajo continúa justo
+    después del último trozo completado.
+    """
+    def __init__(self, base_dir='data/jobs'):
+        self.base_dir = base_dir
+        self.inputs_dir = os.path.join(base_dir, 'inputs')
+        self.db_path = os.path.join(base_dir, 'jobs.db')
+        os.makedirs(self.inputs_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(SCHEMA)
+
+    def upload_path(self, job_id, fmt):
+        return os.path.join(self.inputs_dir, f'{job_id}.{fmt}')
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex
+
+    def submit(self, source_path, fmt=None, tier=None, model_version=None, job_id=None, uploaded=False):
+        """Valida y cuenta las filas del archivo y registra el trabajo como pendiente"""
+        fmt = detect_format(source_path, fmt)
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"Archivo no encontrado: {source_path}")
+        if fmt == 'csv':
+            with open(source_path, 'r', newline='') as f:
+                header = next(csv.reader(f), [])
+            missing = [name for name in VOLUNTEER_COLUMNS + PROJECT_COLUMNS if name not in header]
+            if missing:
+                raise ValueError(f"Faltan columnas en el CSV: {', '.join(missing)}")
+        total_rows = sum(1 for _ in _records(source_path, fmt))
+
+        job_id = job_id or self.new_id()
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO jobs (id, status, source_path, format, uploaded, tier, model_version, '
+                'total_rows, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'pending', source_path, fmt, int(uploaded), tier, model_version,
+                 total_rows, time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Trabajo no encontrado: {job_id}")
+        job = dict(row)
+        job['uploaded'] = bool(job['uploaded'])
+        job['progress'] = job['completed_rows'] / job['total_rows'] if job['total_rows'] else 1.0
+        return job
+
+    def list(self, limit=100):
+        with self._lock:
+            ids = [row[0] for row in self._db.execute(
+                'SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,))]
+        return [self.get(job_id) for job_id in ids]
+
+    def next_runnable(self):
+        """Trabajo más antiguo pendiente o a medias (p. ej. interrumpido por un reinicio)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('running', 'pending') ORDER BY created_at LIMIT 1"
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def mark_running(self, job_id):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) "
+                "WHERE id = ? AND status IN ('pending', 'running')",
+                (time.time(), job_id)
+            )
+
+    def store_chunk(self, job_id, start_row, results):
+        """Guarda los resultados de un trozo y avanza el trabajo (atómico)"""
+        rows = [
+            (job_id, start_row + i, None, None, None, result['error']) if 'error' in result else
+            (job_id, start_row + i, int(result['is_suitable']), float(result['confidence']),
+             float(result['probability_suitable']), None)
+            for i, result in enumerate(results)
+        ]
+        failed = sum(1 for row in rows if row[5] is not None)
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET completed_rows = ?, failed_rows = failed_rows + ? "
+                "WHERE id = ? AND status = 'running' AND completed_rows = ?",
+                (start_row + len(rows), failed, job_id, start_row)
+            )
+            if cursor.rowcount == 0:
+                # Cancelado (o ya guardado) mientras se puntuaba el trozo
+                return False
+            self._db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return True
+
+    def finish(self, job_id, status, error=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ? AND status = 'running'",
+                (status, time.time(), error, job_id)
+            )
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job['status'] in FINAL_STATUSES:
+            return job
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+        return self.get(job_id)
+
+    def delete(self, job_id):
+        """Elimina el trabajo, sus resultados y el archivo subido"""
+        job = self.cancel(job_id)
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM results WHERE job_id = ?', (job_id,))
+            self._db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        if job['uploaded'] and os.path.exists(job['source_path']):
+            os.remove(job['source_path'])
+        return job
+
+    def results(self, job_id, offset=0, limit=1000):
+        """Página de resultados en orden de fila del archivo de entrada"""
+        job = self.get(job_id)
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT row, is_suitable, confidence, probability_suitable, error FROM results '
+                'WHERE job_id = ? AND row >= ? ORDER BY row LIMIT ?',
+                (job_id, offset, limit)
+            ).fetchall()
+        items = [
+            {'row': row['row'], 'error': row['error']} if row['error'] is not None else
+            {'row': row['row'], 'is_suitable': bool(row['is_suitable']),
+             'confidence': row['confidence'], 'probability_suitable': row['probability_suitable']}
+            for row in rows
+        ]
+        next_offset = items[-1]['row'] + 1 if len(items) == limit else None
+        return {'job': job, 'offset': offset, 'results': items, 'next_offset': next_offset}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
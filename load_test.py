@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Generador de carga asíncrono que reproduce un log NDJSON de peticiones contra
+la API, en proceso (ASGI, sin red) o contra un servidor uvicorn.
+
+Cada línea del log es {"method": "POST", "path": "/predict?tier=fast", "body": {...}}
+o directamente el cuerpo de /predict ({"volunteer": ..., "project": ...}).
+Las líneas que no encajan se ignoran. Las peticiones se lanzan a ritmo fijo
+(lazo abierto): la latencia se mide desde el instante programado, así que
+incluye la espera cuando el servidor o la concurrencia no dan abasto.
+
+Uso:
+  python load_test.py --generate data/request_log.ndjson 5000
+  python load_test.py data/request_log.ndjson --rps 200 --duration 30
+  python load_test.py data/request_log.ndjson --url http://localhost:8000 --ramp 50:800:50
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+import httpx
+
+from warmup import warmup_pairs
+
+
+def generate_log(path, n_requests, batch_fraction=0.05, batch_size=100, seed=42):
+    """
+    Log sintético: sobre todo /predict, con algunos /predict/batch. Los pares
+    siguen las distribuciones de los datos de entrenamiento (warmup.py), no
+    la escala 0-1 del benchmark del modelo simple, para que la carga no sea
+    casi toda de negativos evidentes.
+    """
+    rng = random.Random(seed)
+    pairs = warmup_pairs(n_requests, seed=seed)
+    with open(path, 'w') as f:
+        for volunteer, project in pairs:
+            if rng.random() < batch_fraction:
+                batch = [{'volunteer': volunteer, 'project': project}] * batch_size
+                record = {'method': 'POST', 'path': '/predict/batch', 'body': batch}
+            else:
+                record = {'method': 'POST', 'path': '/predict', 'body': {'volunteer': volunteer, 'project': project}}
+            f.write(json.dumps(record) + '\n')
+    print(f"✅ Log de {n_requests} peticiones escrito en {path}")
+
+
+def load_log(path):
+    """Lee el log NDJSON y devuelve las peticiones reproducibles (method, path, body)"""
+    records, skipped = [], 0
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if isinstance(record, dict) and 'path' in record:
+                records.append((record.get('method', 'POST').upper(), record['path'], record.get('body')))
+            elif isinstance(record, dict) and 'volunteer' in record and 'project' in record:
+                records.append(('POST', '/predict', record))
+            else:
+                skipped += 1
+    if skipped:
+        print(f"⚠️ {skipped} líneas ignoradas (no son peticiones reproducibles)")
+    if not records:
+        raise ValueError(f"No hay peticiones reproducibles en {path}")
+    return records
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def summarize(samples, seconds):
+    """Throughput, percentiles de latencia (ms) y errores de una lista de (fin, latencia, status)"""
+    latencies = sorted(latency for _, latency, _ in samples)
+    statuses = Counter(status for _, _, status in samples)
+    errors = sum(count for status, count in statuses.items() if status == 'error' or status >= 400)
+    return {
+        'requests': len(samples),
+        'throughput': len(samples) / seconds if seconds else 0.0,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'max_ms': _ms(latencies[-1] if latencies else None),
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)}
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def _format(stats):
+    def fmt(value):
+        return '   -   ' if value is None else f'{value:7.1f}'
+    return (f"{stats['throughput']:8.1f} req/s  p50 {fmt(stats['p50_ms'])}  p95 {fmt(stats['p95_ms'])}  "
+            f"p99 {fmt(stats['p99_ms'])} ms  errores {stats['error_rate']:6.2%}")
+
+
+async def run_stage(client, records, rps, duration, concurrency, report_interval=5.0):
+    """
+    Lanza peticiones a `rps` durante `duration` segundos con como mucho
+    `concurrency` en vuelo y devuelve el resumen de la etapa con su evolución
+    por intervalos
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    tasks = set()
+
+    async def send(record, scheduled):
+        method, path, body = record
+        async with semaphore:
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 'error'
+        samples.append((time.perf_counter(), time.perf_counter() - scheduled, status))
+
+    timeline = []
+
+    async def report(start):
+        reported = 0
+        while True:
+            await asyncio.sleep(report_interval)
+            window = samples[reported:]
+            reported = len(samples)
+            stats = summarize(window, report_interval)
+            stats['t'] = round(time.perf_counter() - start, 1)
+            timeline.append(stats)
+            print(f"  t={stats['t']:6.1f}s  {_format(stats)}")
+
+    start = time.perf_counter()
+    reporter = asyncio.create_task(report(start))
+    i = 0
+    while True:
+        scheduled = start + i / rps
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(send(records[i % len(records)], scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        i += 1
+
+    if tasks:
+        await asyncio.wait(tasks)
+    reporter.cancel()
+    elapsed = time.perf_counter() - start
+
+    stats = summarize(samples, elapsed)
+    stats.update({'target_rps': rps, 'seconds': round(elapsed, 2), 'timeline': timeline})
+    return stats
+
+
+def saturated(stats, max_error_rate, slo_ms):
+    """La etapa no sostuvo la carga: throughput bajo, errores o p99 por encima del SLO"""
+    if stats['throughput'] < 0.9 * stats['target_rps']:
+        return 'throughput'
+    if stats['error_rate'] > max_error_rate:
+        return 'errores'
+    if slo_ms is not None and stats['p99_ms'] is not None and stats['p99_ms'] > slo_ms:
+        return 'p99'
+    return None
+
+
+async def wait_until_ready(client, timeout, interval=0.5):
+    """
+    Espera a que /health/ready responda 200 (modelo cargado y calentado): los
+    503 del arranque no deben contar como saturación de la primera etapa
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            response = await client.get('/health/ready')
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass  # el servidor aún no acepta conexiones
+        if time.perf_counter() >= deadline:
+            raise TimeoutError(f"La API no estuvo lista tras {timeout:.0f}s (/health/ready)")
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    records = load_log(args.log)
+    stages = [args.rps]
+    if args.ramp:
+        start, stop, step = (float(x) for x in args.ramp.split(':'))
+        stages = []
+        while start <= stop:
+            stages.append(start)
+            start += step
+
+    async def run_stages(client):
+        ready = await wait_until_ready(client, args.ready_timeout)
+        print(f"✅ API lista (versión {ready.get('model_version')})")
+        results = []
+        for rps in stages:
+            print(f"▶️ {rps:.0f} req/s durante {args.duration:.0f}s (concurrencia {args.concurrency})")
+            stats = await run_stage(client, records, rps, args.duration, args.concurrency, args.report_interval)
+            reason = saturated(stats, args.max_error_rate, args.slo_ms)
+            stats['saturated'] = reason
+            results.append(stats)
+            print(f"   total: {_format(stats)}")
+            if reason and args.ramp:
+                print(f"🛑 Saturación a {rps:.0f} req/s ({reason})")
+                break
+        return results
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            results = await run_stages(client)
+    else:
+        # En proceso: la app y el generador comparten el event loop
+        import main
+
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://app', timeout=timeout) as client:
+                results = await run_stages(client)
+
+    sustained = [stats['target_rps'] for stats in results if not stats['saturated']]
+    if args.ramp:
+        print(f"📈 Máximo sostenido: {max(sustained):.0f} req/s" if sustained else "📈 Ninguna etapa sostenida")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'target': args.url or 'in-process', 'stages': results}, f, indent=2)
+        print(f"✅ Resultados guardados en {args.json}")
+    return results
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Reproduce un log NDJSON de peticiones contra la API")
+    parser.add_argument('log', nargs='?', help="log NDJSON de peticiones")
+    parser.add_argument('--generate', nargs=2, metavar=('SALIDA', 'N'), help="genera un log sintético y termina")
+    parser.add_argument('--url', help="URL del servidor (por defecto, la app en proceso)")
+    parser.add_argument('--rps', type=float, default=50, help="peticiones por segundo")
+    parser.add_argument('--ramp', help="rampa INICIO:FIN:PASO de req/s hasta saturar")
+    parser.add_argument('--duration', type=float, default=20, help="segundos por etapa")
+    parser.add_argument('--concurrency', type=int, default=64, help="peticiones en vuelo como máximo")
+    parser.add_argument('--report-interval', type=float, default=5, help="segundos entre informes")
+    parser.add_argument('--timeout', type=float, default=30, help="timeout por petición (s)")
+    parser.add_argument('--ready-timeout', type=float, default=120,
+                        help="segundos máximos de espera a /health/ready antes de la primera etapa")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="tasa de error que marca saturación")
+    parser.add_argument('--slo-ms', type=float, help="p99 (ms) que marca saturación")
+    parser.add_argument('--json', help="guarda los resultados en este archivo")
+    args = parser.parse_args(argv)
+    if not args.generate and not args.log:
+        parser.error("indica un log NDJSON o --generate")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.generate:
+        generate_log(args.generate[0], int(args.generate[1]))
+    else:
+        try:
+            asyncio.run(run(args))
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
@@ -1,9 +1,48 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from contextlib import asynccontextmanager
 import uvicorn
 import os
+import copy
+import json
+import time
+import asyncio
+
+from model_registry import ModelRegistry
+from shadow_scoring import ShadowScorer
+from outcome_log import OUTCOME_COLUMNS, OutcomeLog, read_training_table
+from coalescing import RequestCoalescer
+from admission import AdmissionController, Overloaded
+from jobs import JobStore, iter_chunks
+from warmup import warmup_pairs
+
+# Nivel rápido (modelo destilado): solo disponible con scikit-learn
+try:
+    from distillation import StudentModel, distill_student
+except ImportError:
+    StudentModel = None
+    distill_student = None
+
+# Endpoint binario (/predict/binary): requiere numpy; Arrow solo si hay pyarrow
+try:
+    import binary_io
+except ImportError:
+    binary_io = None
+
+# Pool de procesos con memoria compartida (requiere numpy)
+try:
+    from inference_pool import InferencePool
+except ImportError:
+    InferencePool = None
+
+# Monitor de deriva de las entradas (requiere numpy)
+try:
+    from drift import DriftMonitor, build_reference
+except ImportError:
+    DriftMonitor = None
+    build_reference = None
 
 # Cascada de imports: intentar modelo completo -> fallback -> simple
 try:
@@ -29,22 +68,382 @@ except ImportError as e:
 # Cargar modelo al iniciar la aplicación
 model = VolunteerMLModel()
 
+# Registro versionado: la versión activa se cambia intercambiando `model`
+registry = ModelRegistry(VolunteerMLModel)
+model_version = None
+
+# Modelo candidato evaluado en sombra sobre tráfico real; comparte CPU con
+# las peticiones, así que se limita a SHADOW_MAX_ROWS_PER_SECOND filas/s
+shadow = ShadowScorer(max_rows_per_second=float(os.environ.get("SHADOW_MAX_ROWS_PER_SECOND", 10)))
+
+# Resultados reales de asignaciones (log binario + compactación periódica)
+outcome_log = OutcomeLog(os.environ.get("OUTCOME_LOG_DIR", "data/outcomes"))
+OUTCOME_COMPACT_INTERVAL = float(os.environ.get("OUTCOME_COMPACT_INTERVAL", 300))
+
+async def compact_outcomes_periodically():
+    """Compacta el log de resultados en segundo plano"""
+    while True:
+        await asyncio.sleep(OUTCOME_COMPACT_INTERVAL)
+        if outcome_log.pending_rows:
+            try:
+                await asyncio.to_thread(outcome_log.compact)
+            except Exception as e:
+                print(f"❌ Error al compactar el log de resultados: {e}")
+
+# Peticiones /predict idénticas y simultáneas comparten un único cálculo
+coalescer = RequestCoalescer()
+
+# Admisión por prioridad: /predict (interactive) va antes que los trozos de
+# /predict/batch (bulk); con las colas llenas se responde 503 + Retry-After
+admission = AdmissionController(
+    workers=int(os.environ.get("ADMISSION_WORKERS", 4)),
+    interactive_queue=int(os.environ.get("INTERACTIVE_QUEUE_DEPTH", 64)),
+    bulk_concurrency=int(os.environ.get("BULK_CONCURRENCY", 1)),
+    bulk_queue=int(os.environ.get("BULK_QUEUE_DEPTH", 8)),
+    retry_after=int(os.environ.get("RETRY_AFTER_SECONDS", 1))
+)
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", 256))
+# /predict/binary puntúa matrices sin dicts: trozos más grandes por el mismo hueco
+BINARY_CHUNK_SIZE = int(os.environ.get("BINARY_CHUNK_SIZE", 4096))
+
+# Trabajos de puntuación masiva en segundo plano (SQLite en JOBS_DIR)
+jobs = JobStore(os.environ.get("JOBS_DIR", "data/jobs"))
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", 1000))
+# Los cuerpos de /jobs/upload se escriben a disco en bloques de este tamaño
+UPLOAD_WRITE_BYTES = int(os.environ.get("UPLOAD_WRITE_BYTES", 1 << 20))
+jobs_wakeup = asyncio.Event()
+
+def score_job_chunk(scoring_model, pairs, errors):
+    """Puntúa las filas válidas de un trozo; las inválidas conservan su error"""
+    scored = iter(score_pairs(scoring_model, [pair for pair in pairs if pair is not None]))
+    return [{"error": errors[i]} if pair is None else next(scored) for i, pair in enumerate(pairs)]
+
+def job_model(job):
+    """
+    Modelo con el que se puntúa todo un trabajo: la versión activa al enviarlo
+    (aunque después se promueva otra) y su destilado si se pidió tier=fast
+    """
+    version = job['model_version']
+    if version is None:
+        pinned, pinned_student = model, student
+    else:
+        pinned = registry.preload(version)
+        pinned_student = student if version == model_version else read_student(version)
+    if (job['tier'] or DEFAULT_TIER) == "fast" and pinned_student is not None:
+        return pinned_student
+    return pinned
+
+async def run_job(job):
+    """Puntúa un trabajo desde su última fila completada, trozo a trozo"""
+    await asyncio.to_thread(jobs.mark_running, job['id'])
+    chunks = iter_chunks(job['source_path'], job['format'], job['completed_rows'], JOB_CHUNK_SIZE)
+    try:
+        scoring_model = await asyncio.to_thread(job_model, job)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            start_row, pairs, errors = chunk
+            # Mismo carril que /predict/batch: no bloquea las peticiones interactivas
+            async with admission.slot("bulk"):
+                results = await asyncio.to_thread(score_job_chunk, scoring_model, pairs, errors)
+            if not await asyncio.to_thread(jobs.store_chunk, job['id'], start_row, results):
+                return  # cancelado mientras se puntuaba
+        await asyncio.to_thread(jobs.finish, job['id'], 'completed')
+        print(f"✅ Trabajo {job['id']} completado ({job['total_rows']} filas)")
+    except Exception as e:
+        print(f"❌ Error en el trabajo {job['id']}: {e}")
+        await asyncio.to_thread(jobs.finish, job['id'], 'failed', str(e))
+
+async def run_jobs():
+    """Ejecuta los trabajos pendientes (y los interrumpidos por un reinicio) en orden"""
+    while True:
+        jobs_wakeup.clear()
+        if not is_ready():
+            await asyncio.sleep(1)
+            continue
+        job = await asyncio.to_thread(jobs.next_runnable)
+        if job is None:
+            await jobs_wakeup.wait()
+            continue
+        await run_job(job)
+
+# Modelo destilado del modelo activo; DEFAULT_TIER decide qué nivel se usa
+# cuando la petición no indica `tier`
+student = None
+DEFAULT_TIER = os.environ.get("DEFAULT_TIER", "full")
+
+def student_path(version):
+    """
+    El modelo destilado viaja dentro de una versión derivada de su profesor
+    (ver /model/distill); sin registro se guarda en models/
+    """
+    return os.path.join(model_dir(version), 'student.pkl')
+
+def read_student(version):
+    """Carga (si existe) el modelo destilado de una versión; None si no hay"""
+    path = student_path(version)
+    if StudentModel is not None and os.path.exists(path):
+        try:
+            loaded = StudentModel.load(path)
+            print(f"✅ Modelo destilado cargado ({loaded.kind})")
+            return loaded
+        except Exception as e:
+            print(f"❌ Error al cargar el modelo destilado: {e}")
+    return None
+
+def load_student(version):
+    """Activa el modelo destilado de una versión"""
+    global student
+    student = read_student(version)
+
+def select_model(tier):
+    """Devuelve (modelo, nivel) para el nivel pedido; sin destilado se usa el completo"""
+    if (tier or DEFAULT_TIER) == "fast" and student is not None:
+        return student, "fast"
+    return model, "full"
+
+def model_dir(version):
+    """Directorio de artefactos de una versión (o models/ sin registro)"""
+    return os.path.join(registry.versions_dir, version) if version else 'models'
+
+# Pool de procesos para lotes muy grandes (INFERENCE_WORKERS=0 lo desactiva);
+# los lotes pequeños siguen en el proceso principal
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0))
+inference_pool = None
+if INFERENCE_WORKERS > 0 and MODEL_TYPE == "full" and InferencePool is not None:
+    inference_pool = InferencePool(INFERENCE_WORKERS, int(os.environ.get("POOL_MIN_ROWS", 20000)))
+
+def use_pool(scoring_model, n_rows):
+    return inference_pool is not None and scoring_model is model and inference_pool.should_use(n_rows)
+
+# Deriva de las entradas en vivo frente a la referencia de entrenamiento del
+# modelo activo (la de sus metadatos o la recalculada con POST /drift/reference)
+drift_monitor = None
+DRIFT_WINDOW_ROWS = int(os.environ.get("DRIFT_WINDOW_ROWS", 50000))
+# Filas mínimas en la ventana para informar del PSI (por debajo, ruido)
+DRIFT_MIN_ROWS = int(os.environ.get("DRIFT_MIN_ROWS", 500))
+
+def reset_drift_monitor():
+    global drift_monitor
+    reference = getattr(model, 'drift_reference', None)
+    drift_monitor = None
+    if DriftMonitor is not None and reference:
+        drift_monitor = DriftMonitor(reference, model.feature_names, window_rows=DRIFT_WINDOW_ROWS,
+                                     min_rows=DRIFT_MIN_ROWS)
+
+def drift_reference_path(version):
+    """Referencia recalculada de una versión, junto a sus metadatos (fuera del hash de contenido)"""
+    return os.path.join(model_dir(version), 'drift_reference.json')
+
+def load_drift_reference(version, target_model):
+    """Aplica a `target_model` la referencia recalculada de su versión, si la hay"""
+    path = drift_reference_path(version)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                target_model.drift_reference = json.load(f)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la referencia de deriva {path}: {e}")
+
+def save_drift_reference(version, reference):
+    """Guarda la referencia recalculada para que sobreviva a reinicios y cambios de versión"""
+    path = drift_reference_path(version)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(reference, f)
+    os.replace(tmp_path, path)
+
+def reload_pool(directory):
+    """
+    Carga en el pool el modelo de `directory`. Si falla, los workers vuelven
+    al modelo anterior (o, si tampoco es posible, se detiene el pool y los
+    lotes se puntúan en proceso) y se relanza el error.
+    """
+    if inference_pool is None or not inference_pool.running or inference_pool.model_dir == directory:
+        return
+    previous = inference_pool.model_dir
+    try:
+        inference_pool.load(directory)
+    except Exception:
+        try:
+            inference_pool.load(previous)
+        except Exception as e:
+            print(f"❌ No se pudo restaurar el pool de inferencia, se detiene: {e}")
+            inference_pool.stop()
+        raise
+
+def prepare_activation(version, new_model):
+    """
+    Parte lenta de activar una versión (recarga del pool, referencia de deriva
+    y lectura del modelo destilado); se ejecuta antes de intercambiar el
+    modelo que atiende. Las peticiones que aún usan el modelo anterior no se
+    envían al pool mientras tanto (score_pairs comprueba qué modelo tiene cargado).
+    """
+    reload_pool(model_dir(version))
+    load_drift_reference(version, new_model)
+    return read_student(version)
+
+def swap_model(version, new_model, new_student):
+    """Intercambia el modelo que atiende las peticiones (solo referencias)"""
+    global model, model_version, student
+    model = new_model
+    model_version = version
+    student = new_student
+    reset_drift_monitor()
+
+def activate_model(version, new_model):
+    """Activa una versión ya cargada (bloqueante: fuera del event loop)"""
+    swap_model(version, new_model, prepare_activation(version, new_model))
+
+async def switch_model(version, commit):
+    """
+    Activa `version` sin bloquear el event loop: en un hilo la precarga,
+    recarga el pool y lee el modelo destilado, y solo entonces `commit()`
+    (promote o rollback del registro) mueve el puntero. Si algo falla antes,
+    el puntero, el pool y el modelo servido siguen en la versión anterior.
+    """
+    def prepare():
+        new_model = registry.preload(version)
+        previous_dir = inference_pool.model_dir if inference_pool is not None else None
+        new_student = prepare_activation(version, new_model)
+        try:
+            commit()
+        except Exception:
+            if previous_dir is not None:
+                reload_pool(previous_dir)
+            raise
+        return new_model, new_student
+    
+    new_model, new_student = await asyncio.to_thread(prepare)
+    swap_model(version, new_model, new_student)
+    return version
+
+# Arranque en segundo plano: el servidor acepta conexiones de inmediato y el
+# modelo se carga y calienta después; /health/ready indica cuándo puede servir
+startup = {
+    'phase': 'starting',
+    'started_at': time.time(),
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'warmup_error': None,
+    'error': None
+}
+WARMUP_PAIRS = int(os.environ.get("WARMUP_PAIRS", 256))
+
+def is_ready():
+    return startup['phase'] == 'ready' and model.is_trained
+
+def load_initial_model():
+    """Carga la versión activa del registro o, sin registro, los artefactos de models/"""
+    current = registry.current_version()
+    if current:
+        try:
+            activate_model(current, registry.preload(current))
+            print(f"✅ Modelo cargado desde el registro (versión {current})")
+        except Exception as e:
+            print(f"❌ Error al cargar la versión {current}: {e}")
+    
+    if model_version is None:
+        # Sin registro: artefactos sueltos en models/
+        if os.path.exists('models/volunteer_model.pkl'):
+            success = model.load_model()
+            if success:
+                load_drift_reference(None, model)
+                print("✅ Modelo cargado exitosamente")
+            else:
+                print("❌ Error al cargar el modelo")
+        else:
+            print("⚠️ No se encontró modelo entrenado. Entrena el modelo primero.")
+        load_student(None)
+        reset_drift_monitor()
+
+def warm_up():
+    """
+    Predicciones sintéticas por los mismos caminos que las peticiones reales
+    (individual y por lotes, en ambos niveles) para pagar antes de la primera
+    petición los costes de primera ejecución de pandas/scikit-learn/numpy
+    """
+    if not model.is_trained or WARMUP_PAIRS <= 0:
+        return
+    pairs = warmup_pairs(WARMUP_PAIRS)
+    for scoring_model in [model] + ([student] if student is not None else []):
+        scoring_model.predict(*pairs[0])
+        score_pairs(scoring_model, pairs[:BULK_CHUNK_SIZE])
+        if binary_io is not None and hasattr(scoring_model, 'predict_matrix'):
+            scoring_model.predict_matrix(binary_io.pairs_to_matrix(pairs, scoring_model.feature_names))
+
+async def load_and_warm_up():
+    """Carga, arranca el pool y calienta el modelo sin bloquear el event loop"""
+    try:
+        startup['phase'] = 'loading'
+        start = time.perf_counter()
+        await asyncio.to_thread(load_initial_model)
+        startup['load_seconds'] = time.perf_counter() - start
+        
+        if inference_pool is not None and model.is_trained:
+            try:
+                await asyncio.to_thread(inference_pool.start, model_dir(model_version))
+            except Exception as e:
+                print(f"❌ Error al iniciar el pool de inferencia: {e}")
+                inference_pool.stop()
+        
+        startup['phase'] = 'warming_up'
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            # Sin calentar se sirve igual: la primera petición paga los costes de arranque
+            startup['warmup_error'] = str(e)
+            print(f"⚠️ Error en el calentamiento, se continúa sin él: {e}")
+        startup['warmup_seconds'] = time.perf_counter() - start
+        startup['phase'] = 'ready'
+        print(f"✅ Servicio listo (carga {startup['load_seconds']:.2f}s, "
+              f"calentamiento {startup['warmup_seconds']:.2f}s)")
+    except Exception as e:
+        startup['phase'] = 'failed'
+        startup['error'] = str(e)
+        print(f"❌ Error en el arranque: {e}")
+
+def require_ready():
+    """503 (con Retry-After) mientras el modelo se carga o si no hay modelo entrenado"""
+    if startup['phase'] in ('starting', 'loading', 'warming_up'):
+        raise HTTPException(
+            status_code=503,
+            detail="El modelo se está cargando, reintenta en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+    if not model.is_trained:
+        raise HTTPException(status_code=503, detail="Modelo no está entrenado. Contacta al administrador.")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manejo del ciclo de vida de la aplicación"""
-    # Startup
-    if os.path.exists('models/volunteer_model.pkl'):
-        success = model.load_model()
-        if success:
-            print("✅ Modelo cargado exitosamente")
-        else:
-            print("❌ Error al cargar el modelo")
-    else:
-        print("⚠️ No se encontró modelo entrenado. Entrena el modelo primero.")
+    # Startup: no se espera a la carga del modelo para aceptar conexiones
+    startup_task = asyncio.create_task(load_and_warm_up())
+    
+    # Sin numpy el log sigue aceptando resultados, pero no se compacta
+    compaction_task = None
+    if outcome_log.can_compact:
+        compaction_task = asyncio.create_task(compact_outcomes_periodically())
+    jobs_task = asyncio.create_task(run_jobs())
     
     yield
     
     # Shutdown
+    startup_task.cancel()
+    if compaction_task is not None:
+        compaction_task.cancel()
+    jobs_task.cancel()
+    try:
+        await jobs_task
+    except asyncio.CancelledError:
+        pass
+    jobs.close()
+    outcome_log.close()
+    shadow.stop()
+    if inference_pool is not None:
+        inference_pool.stop()
     print("🔄 Cerrando aplicación...")
 
 app = FastAPI(
@@ -54,6 +453,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Modelos Pydantic para validación de datos
 class VolunteerData(BaseModel):
     reliability: float
@@ -79,9 +486,151 @@ class PredictionResponse(BaseModel):
     confidence: float
     probability_suitable: float
     message: str
+    tier: Optional[str] = None
+    explanation: Optional[dict] = None
 
 class RetrainRequest(BaseModel):
     data_path: Optional[str] = "data/training_data.csv"
+    promote: bool = True
+    mode: Literal["full", "incremental"] = "full"
+    n_new_trees: int = 10  # solo en modo incremental
+
+class OutcomeData(BaseModel):
+    reliability: float
+    punctuality: float
+    task_quality: float
+    success_rate: float
+    total_projects: int
+    completed_projects: int
+    total_hours: float
+    availability_hours: float
+    project_duration: float
+    project_complexity: float
+    required_hours: float
+    is_suitable: bool
+
+class DistillRequest(BaseModel):
+    kind: Literal["tree", "logistic"] = "tree"
+    n_samples: int = 20000
+    max_depth: int = 6
+    # Sin holdout_path se evalúa sobre una muestra sintética que el teacher no vio
+    holdout_path: Optional[str] = None
+    promote: bool = True
+
+class CompactRequest(BaseModel):
+    tolerance: float = 0.005
+    min_trees: int = 10
+    data_path: str = "data/training_data.csv"
+    promote: bool = False
+
+class JobRequest(BaseModel):
+    data_path: str
+    format: Optional[Literal["csv", "ndjson"]] = None  # por defecto, según la extensión
+    tier: Optional[Literal["fast", "full"]] = None
+
+class DriftReferenceRequest(BaseModel):
+    data_path: str = "data/training_data.csv"
+
+class VersionRequest(BaseModel):
+    version: str
+
+class ShadowRequest(BaseModel):
+    version: str
+    fraction: float = 0.1
+    max_rows_per_second: Optional[float] = None  # por defecto SHADOW_MAX_ROWS_PER_SECOND
+
+def explain_pairs(pairs):
+    """
+    Contribución de cada característica a la probabilidad (bosque completo).
+    Solo disponible cuando el modelo activo es el RandomForest de scikit-learn.
+    """
+    if not hasattr(model, 'explain_batch'):
+        raise ValueError(f"El modelo '{MODEL_TYPE}' no soporta explicaciones")
+    return model.explain_batch(pairs)
+
+def predict_pair(scoring_model, tier_used, volunteer_data, project_data, explain):
+    """Predicción (y explicación opcional) de un par; se ejecuta fuera del event loop"""
+    start = time.perf_counter()
+    result = scoring_model.predict(volunteer_data, project_data)
+    if tier_used == "full":
+        shadow.submit([(volunteer_data, project_data)], [result], time.perf_counter() - start)
+    if drift_monitor is not None:
+        drift_monitor.observe_pairs([(volunteer_data, project_data)])
+    
+    explanation = None
+    if explain:
+        try:
+            explanation = explain_pairs([(volunteer_data, project_data)])[0]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return result, explanation
+
+def score_chunk(scoring_model, tier_used, pairs, explain):
+    """Puntúa un trozo de /predict/batch (y sus explicaciones) fuera del event loop"""
+    start = time.perf_counter()
+    results = score_pairs(scoring_model, pairs)
+    if tier_used == "full":
+        shadow.submit(pairs, results, time.perf_counter() - start)
+    if drift_monitor is not None:
+        drift_monitor.observe_pairs(pairs)
+    
+    if explain:
+        try:
+            explanations = explain_pairs(pairs)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        results = [
+            {**result, "explanation": explanation}
+            for result, explanation in zip(results, explanations)
+        ]
+    return results
+
+def score_matrix(scoring_model, X):
+    """
+    Etiquetas y probabilidad para una matriz (n, 11) de características base.
+    Los modelos sin predict_matrix puntúan la matriz convertida en pares.
+    """
+    if use_pool(scoring_model, len(X)):
+        try:
+            labels, probability = inference_pool.predict_matrix(X, len(scoring_model.model.classes_),
+                                                                model_dir=model_dir(model_version))
+            return labels.astype(bool), probability[:, -1]
+        except Exception as e:
+            print(f"⚠️ Error en el pool de inferencia, puntuando en proceso: {e}")
+    
+    if hasattr(scoring_model, 'predict_matrix'):
+        return scoring_model.predict_matrix(X)
+    pairs = binary_io.matrix_to_pairs(X, scoring_model.feature_names)
+    return binary_io.results_to_columns(score_pairs(scoring_model, pairs))
+
+def score_pairs(scoring_model, pairs):
+    """
+    Puntúa una lista de pares (voluntario, proyecto). Los lotes muy grandes
+    del modelo completo se reparten en el pool de procesos; el resto usa
+    predict_batch si el modelo lo ofrece y, si el lote falla, se repite par a
+    par para aislar errores.
+    """
+    if use_pool(scoring_model, len(pairs)):
+        try:
+            labels, probability = inference_pool.predict_pairs(pairs, len(scoring_model.model.classes_),
+                                                               model_dir=model_dir(model_version))
+            return scoring_model._results(labels, probability)
+        except Exception as e:
+            print(f"⚠️ Error en el pool de inferencia, puntuando en proceso: {e}")
+    
+    if hasattr(scoring_model, 'predict_batch'):
+        try:
+            return scoring_model.predict_batch(pairs)
+        except Exception as e:
+            print(f"⚠️ Error en predicción por lotes, reintentando par a par: {e}")
+    
+    results = []
+    for volunteer_data, project_data in pairs:
+        try:
+            results.append(scoring_model.predict(volunteer_data, project_data))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
 
 @app.get("/")
 async def root():
@@ -102,27 +651,50 @@ async def health_check():
         "model_status": "loaded" if model.is_trained else "not_loaded",
         "model_type": MODEL_TYPE,
         "api_version": "1.0.0",
-        "ready": True
+        "ready": is_ready(),
+        "startup": startup
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: el proceso responde (no depende del modelo)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: el modelo está cargado y calentado; 503 mientras no lo esté"""
+    body = {"ready": is_ready(), "model_version": model_version, **startup}
+    if not body["ready"]:
+        return JSONResponse(status_code=503, content=body, headers={"Retry-After": "1"})
+    return body
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_volunteer_suitability(request: PredictionRequest):
+async def predict_volunteer_suitability(request: PredictionRequest, tier: Optional[Literal["fast", "full"]] = None,
+                                        explain: bool = False):
     """
     Predice si un voluntario es adecuado para un proyecto específico
+    
+    `tier=fast` usa el modelo destilado (si existe); `tier=full` el bosque completo.
+    `explain=true` añade la contribución de cada característica según el bosque completo.
     """
-    if not model.is_trained:
-        raise HTTPException(
-            status_code=503, 
-            detail="Modelo no está entrenado. Contacta al administrador."
-        )
+    require_ready()
     
     try:
         # Convertir datos Pydantic a diccionarios
         volunteer_data = request.volunteer.model_dump()
         project_data = request.project.model_dump()
         
-        # Hacer predicción
-        result = model.predict(volunteer_data, project_data)
+        # Hacer predicción: las peticiones simultáneas con el mismo payload,
+        # versión de modelo y opciones esperan el mismo cálculo
+        scoring_model, tier_used = select_model(tier)
+        key = (request.model_dump_json(), model_version, id(scoring_model), tier_used, explain)
+        async def compute():
+            async with admission.slot("interactive"):
+                return await asyncio.to_thread(
+                    predict_pair, scoring_model, tier_used, volunteer_data, project_data, explain
+                )
+        
+        result, explanation = await coalescer.run(key, compute)
         
         # Generar mensaje descriptivo
         if result['is_suitable']:
@@ -140,9 +712,13 @@ async def predict_volunteer_suitability(request: PredictionRequest):
             is_suitable=result['is_suitable'],
             confidence=result['confidence'],
             probability_suitable=result['probability_suitable'],
-            message=message
+            message=message,
+            tier=tier_used,
+            explanation=explanation
         )
         
+    except (HTTPException, Overloaded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la predicción: {str(e)}")
 
@@ -151,6 +727,10 @@ async def retrain_model(request: RetrainRequest):
     """
     Re-entrena el modelo con nuevos datos
     """
+    if MODEL_TYPE != "full":
+        # Los niveles fallback y simple no guardan un modelo que se pueda volver a cargar
+        raise HTTPException(status_code=503, detail="El re-entrenamiento requiere el modelo completo con scikit-learn")
+    
     try:
         if not os.path.exists(request.data_path):
             raise HTTPException(
@@ -158,21 +738,253 @@ async def retrain_model(request: RetrainRequest):
                 detail=f"Archivo de datos no encontrado: {request.data_path}"
             )
         
-        # Re-entrenar modelo
-        accuracy = model.train(request.data_path)
+        # update() añade árboles al RandomForest de scikit-learn: no sirve
+        # con un bosque podado o en formato compacto
+        if request.mode == "incremental" and (
+            not model.is_trained or not hasattr(model, 'update') or not hasattr(model.model, 'estimators_')
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="La actualización incremental requiere el modelo completo entrenado"
+            )
         
-        # Guardar modelo actualizado
-        model.save_model()
+        # Re-entrenar sobre una instancia nueva y en un hilo: el modelo activo
+        # sigue atendiendo peticiones hasta que la nueva versión se promueva
+        base_model, base_version = model, model_version
+        
+        def train_and_register():
+            start = time.perf_counter()
+            if request.mode == "incremental":
+                new_model = copy.deepcopy(base_model)
+                accuracy = new_model.update(request.data_path, request.n_new_trees)
+            else:
+                new_model = VolunteerMLModel()
+                accuracy = new_model.train(request.data_path)
+            train_seconds = time.perf_counter() - start
+            
+            # Guardar como nueva versión del registro
+            version_info = registry.register(
+                new_model,
+                accuracy=accuracy,
+                data_path=request.data_path,
+                timings={'train_seconds': train_seconds},
+                extra={
+                    'mode': request.mode,
+                    'base_version': base_version if request.mode == "incremental" else None,
+                    'evaluation': getattr(new_model, 'evaluation', None)
+                }
+            )
+            return new_model, accuracy, train_seconds, version_info
+        
+        new_model, accuracy, train_seconds, version_info = await asyncio.to_thread(train_and_register)
+        evaluation = getattr(new_model, 'evaluation', None)
+        
+        if request.promote:
+            version = version_info['version']
+            await switch_model(version, lambda: registry.promote(version))
         
         return {
             "message": "Modelo re-entrenado exitosamente",
             "accuracy": accuracy,
+            "evaluation": evaluation,
+            "version": version_info['version'],
+            "mode": request.mode,
+            "train_seconds": train_seconds,
+            "promoted": request.promote,
             "status": "success"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al re-entrenar: {str(e)}")
 
+@app.post("/outcomes")
+async def ingest_outcomes(outcomes: list[OutcomeData]):
+    """
+    Registra resultados reales de asignaciones para futuros re-entrenamientos
+    """
+    rows = [tuple(getattr(outcome, column) for column in OUTCOME_COLUMNS) for outcome in outcomes]
+    try:
+        accepted = await asyncio.to_thread(outcome_log.append, rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al registrar resultados: {str(e)}")
+    
+    return {"accepted": accepted, "pending_rows": outcome_log.pending_rows}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Crea un trabajo de puntuación masiva sobre un archivo local (CSV o NDJSON)
+    """
+    try:
+        job = await asyncio.to_thread(
+            jobs.submit, request.data_path, request.format, request.tier, model_version
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    jobs_wakeup.set()
+    return job
+
+@app.post("/jobs/upload", status_code=202)
+async def upload_job(request: Request, format: Literal["csv", "ndjson"] = "csv",
+                     tier: Optional[Literal["fast", "full"]] = None):
+    """
+    Crea un trabajo a partir del cuerpo de la petición (CSV o NDJSON sin codificar)
+    """
+    job_id = jobs.new_id()
+    path = jobs.upload_path(job_id, format)
+    # El cuerpo se acumula en bloques y cada escritura va a un hilo
+    f = await asyncio.to_thread(open, path, 'wb')
+    try:
+        buffer = bytearray()
+        async for chunk in request.stream():
+            buffer += chunk
+            if len(buffer) >= UPLOAD_WRITE_BYTES:
+                await asyncio.to_thread(f.write, buffer)
+                buffer = bytearray()
+        await asyncio.to_thread(f.write, buffer)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        os.remove(path)
+        raise
+    await asyncio.to_thread(f.close)
+    
+    try:
+        job = await asyncio.to_thread(jobs.submit, path, format, tier, model_version, job_id, True)
+    except ValueError as e:
+        os.remove(path)
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    jobs_wakeup.set()
+    return job
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 100):
+    """
+    Lista los trabajos más recientes
+    """
+    return {"jobs": await asyncio.to_thread(jobs.list, limit)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Estado y progreso de un trabajo
+    """
+    try:
+        return await asyncio.to_thread(jobs.get, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 1000):
+    """
+    Página de resultados de un trabajo; `next_offset` indica la página siguiente
+    """
+    try:
+        return await asyncio.to_thread(jobs.results, job_id, max(offset, 0), min(max(limit, 1), 10000))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    Cancela un trabajo; los resultados ya calculados se conservan
+    """
+    try:
+        return await asyncio.to_thread(jobs.cancel, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """
+    Cancela un trabajo y elimina sus resultados y el archivo subido
+    """
+    try:
+        return await asyncio.to_thread(jobs.delete, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.get("/outcomes")
+async def get_outcome_log_stats():
+    """
+    Estado del log de resultados
+    """
+    return outcome_log.stats()
+
+@app.post("/outcomes/compact")
+async def compact_outcomes():
+    """
+    Fuerza la compactación del log al conjunto columnar de entrenamiento
+    """
+    if not outcome_log.can_compact:
+        raise HTTPException(status_code=503, detail="La compactación del log de resultados requiere numpy")
+    try:
+        result = await asyncio.to_thread(outcome_log.compact)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al compactar: {str(e)}")
+    
+    return {**result, "data_path": outcome_log.table_path}
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Métricas de servicio: agrupación de peticiones /predict simultáneas y admisión
+    """
+    return {
+        "model_version": model_version,
+        "coalescing": coalescer.stats(),
+        "admission": admission.stats(),
+        "inference_pool": inference_pool.stats() if inference_pool is not None else None
+    }
+
+@app.get("/drift")
+async def get_drift():
+    """
+    Deriva de las entradas en vivo (PSI por característica) frente a la
+    distribución de entrenamiento del modelo activo
+    """
+    if drift_monitor is None:
+        return {
+            "status": "no_reference",
+            "message": "El modelo activo no tiene histogramas de referencia; re-entrena o usa POST /drift/reference"
+        }
+    return {"version": model_version, **await asyncio.to_thread(drift_monitor.scores)}
+
+@app.post("/drift/reference")
+async def rebuild_drift_reference(request: DriftReferenceRequest):
+    """
+    Calcula los histogramas de referencia del modelo activo a partir de un
+    conjunto de datos (p. ej. para modelos entrenados antes del monitor). Se
+    guardan junto a los metadatos de la versión activa, así que se conservan
+    tras reiniciar o volver a activarla.
+    """
+    if build_reference is None or not hasattr(model, 'prepare_features'):
+        raise HTTPException(status_code=400, detail="El monitor de deriva requiere numpy y pandas")
+    if not os.path.exists(request.data_path):
+        raise HTTPException(status_code=404, detail=f"Archivo de datos no encontrado: {request.data_path}")
+    
+    target_model, target_version = model, model_version
+    
+    def build():
+        X = target_model.prepare_features(read_training_table(request.data_path))
+        reference = build_reference(X.to_numpy(), list(X.columns))
+        save_drift_reference(target_version, reference)
+        return reference
+    
+    try:
+        target_model.drift_reference = await asyncio.to_thread(build)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al calcular la referencia: {str(e)}")
+    
+    if target_model is model:
+        reset_drift_monitor()
+    return {"version": target_version, "reference_rows": target_model.drift_reference['n_rows']}
+
 @app.get("/model/info")
 async def get_model_info():
     """
@@ -185,6 +997,10 @@ async def get_model_info():
         "status": "trained",
         "model_type": MODEL_TYPE,
         "implementation": getattr(model, 'model_type', 'RandomForestClassifier'),
+        "version": model_version,
+        "fast_tier": student.report if student is not None else None,
+        "early_exit": model.early_exit_stats() if hasattr(model, 'early_exit_stats') else None,
+        "default_tier": DEFAULT_TIER,
         "feature_names": model.feature_names,
         "is_trained": model.is_trained,
         "note": {
@@ -194,28 +1010,265 @@ async def get_model_info():
         }.get(MODEL_TYPE, "Tipo desconocido")
     }
 
-@app.post("/predict/batch")
-async def predict_batch(requests: list[PredictionRequest]):
+@app.post("/model/distill")
+async def distill_fast_tier(request: DistillRequest):
     """
-    Realizar múltiples predicciones en lote
+    Destila el modelo activo en un modelo compacto de baja latencia (tier=fast).
+    En el registro el destilado se publica en una versión nueva derivada de
+    la activa (que no se modifica) y, con `promote`, esa versión pasa a ser la activa.
     """
+    global student
+    if distill_student is None or MODEL_TYPE != "full":
+        raise HTTPException(status_code=400, detail="La destilación requiere el modelo completo con scikit-learn")
     if not model.is_trained:
-        raise HTTPException(
-            status_code=503, 
-            detail="Modelo no está entrenado"
+        raise HTTPException(status_code=503, detail="Modelo no está entrenado")
+    
+    teacher, teacher_version = model, model_version
+    
+    def distill_version():
+        new_student, report = distill_student(
+            teacher,
+            n_samples=request.n_samples,
+            kind=request.kind,
+            max_depth=request.max_depth,
+            holdout_path=request.holdout_path,
+            teacher_version=teacher_version
         )
+        if teacher_version is None:
+            new_student.save(student_path(None))
+            return None, new_student, report
+        
+        def write_student(directory):
+            new_student.save(os.path.join(directory, 'student.pkl'))
+            return {'distillation': report}
+        
+        return registry.derive(teacher_version, write_student)['version'], new_student, report
     
-    results = []
-    for req in requests:
+    try:
+        student_version, new_student, report = await asyncio.to_thread(distill_version)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la destilación: {str(e)}")
+    
+    # Solo se activa si el modelo activo no cambió mientras se destilaba
+    promoted = request.promote and model_version == teacher_version
+    if promoted and student_version is None:
+        student = new_student
+    elif promoted:
         try:
-            volunteer_data = req.volunteer.model_dump()
-            project_data = req.project.model_dump()
-            result = model.predict(volunteer_data, project_data)
-            results.append(result)
+            await switch_model(student_version, lambda: registry.promote(student_version))
         except Exception as e:
-            results.append({"error": str(e)})
+            raise HTTPException(status_code=500, detail=f"Error al promover la versión destilada: {str(e)}")
+    
+    return {
+        "version": student_version,
+        "parent_version": teacher_version,
+        "promoted": promoted,
+        "report": report
+    }
+
+@app.post("/model/compact")
+async def compact_active_forest(request: CompactRequest):
+    """
+    Poda y compacta a float32 el bosque del modelo activo dentro de la
+    tolerancia de accuracy indicada. En el registro el resultado es una
+    versión nueva derivada de la activa (que no se modifica) y se activa
+    con `promote` o con /model/promote; sin registro se guarda en models/.
+    """
+    if MODEL_TYPE != "full":
+        raise HTTPException(status_code=400, detail="La compactación requiere el modelo completo con scikit-learn")
+    require_ready()
+    
+    forest, version = model, model_version
+    
+    def write_pruned(directory):
+        report = forest.compact(directory, data_path=request.data_path, tolerance=request.tolerance,
+                                min_trees=request.min_trees)
+        return {'compaction': report}
+    
+    def compact_version():
+        if version is None:
+            return None, write_pruned(model_dir(None))['compaction']
+        version_info = registry.derive(version, write_pruned)
+        return version_info['version'], version_info['compaction']
+    
+    try:
+        pruned_version, report = await asyncio.to_thread(compact_version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al compactar el bosque: {str(e)}")
+    
+    promoted = request.promote and pruned_version is not None
+    if promoted:
+        try:
+            await switch_model(pruned_version, lambda: registry.promote(pruned_version))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al promover la versión compactada: {str(e)}")
+    
+    return {
+        "version": pruned_version,
+        "parent_version": version,
+        "promoted": promoted,
+        "report": report
+    }
+
+@app.get("/model/versions")
+async def list_model_versions():
+    """
+    Lista las versiones registradas del modelo
+    """
+    return {
+        "current": model_version,
+        "versions": registry.list_versions()
+    }
+
+@app.post("/model/preload")
+async def preload_model_version(request: VersionRequest):
+    """
+    Carga una versión en memoria sin activarla
+    """
+    try:
+        await asyncio.to_thread(registry.preload, request.version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al precargar: {str(e)}")
+    
+    return {"version": request.version, "status": "preloaded"}
+
+@app.post("/model/promote")
+async def promote_model_version(request: VersionRequest):
+    """
+    Activa una versión registrada del modelo
+    """
+    try:
+        await switch_model(request.version, lambda: registry.promote(request.version))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al promover: {str(e)}")
+    
+    return {"version": model_version, "status": "promoted"}
+
+@app.post("/model/rollback")
+async def rollback_model_version():
+    """
+    Vuelve a la versión activa anterior
+    """
+    try:
+        previous = await asyncio.to_thread(registry.previous_version)
+        await switch_model(previous, registry.rollback)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en rollback: {str(e)}")
+    
+    return {"version": model_version, "status": "rolled_back"}
+
+@app.post("/model/shadow")
+async def start_shadow_scoring(request: ShadowRequest):
+    """
+    Evalúa una versión candidata en sombra sobre una fracción del tráfico,
+    con como mucho `max_rows_per_second` filas puntuadas por segundo
+    """
+    try:
+        candidate = await asyncio.to_thread(registry.preload, request.version)
+        shadow.start(request.version, candidate, request.fraction, request.max_rows_per_second)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al iniciar modo sombra: {str(e)}")
+    
+    return shadow.stats()
+
+@app.get("/model/shadow")
+async def get_shadow_stats():
+    """
+    Acuerdo, deriva de probabilidad y latencia del candidato frente a producción
+    """
+    return shadow.stats()
+
+@app.delete("/model/shadow")
+async def stop_shadow_scoring():
+    """
+    Detiene la evaluación en sombra
+    """
+    stats = shadow.stats()
+    shadow.stop()
+    return stats
+
+@app.post("/predict/batch")
+async def predict_batch(requests: list[PredictionRequest], tier: Optional[Literal["fast", "full"]] = None,
+                        explain: bool = False):
+    """
+    Realizar múltiples predicciones en lote
+    
+    `explain=true` añade a cada resultado su explicación por característica
+    """
+    require_ready()
+    
+    pairs = [(req.volunteer.model_dump(), req.project.model_dump()) for req in requests]
+    
+    # El lote se puntúa en trozos de BULK_CHUNK_SIZE; entre trozo y trozo
+    # se libera el hueco de cálculo para las peticiones interactivas. Un lote
+    # que va al pool de procesos no compite por el GIL y se envía entero.
+    scoring_model, tier_used = select_model(tier)
+    chunk_size = max(len(pairs), 1) if use_pool(scoring_model, len(pairs)) else BULK_CHUNK_SIZE
+    results = []
+    async with admission.bulk_request():
+        for i in range(0, len(pairs), chunk_size):
+            async with admission.slot("bulk"):
+                results.extend(await asyncio.to_thread(
+                    score_chunk, scoring_model, tier_used, pairs[i:i + chunk_size], explain
+                ))
+    
+    return {"predictions": results, "tier": tier_used}
+
+@app.post("/predict/binary")
+async def predict_binary(request: Request, tier: Optional[Literal["fast", "full"]] = None):
+    """
+    Predicción masiva sobre un cuerpo binario con una columna por característica
+    (en el orden de feature_names):
+    
+    - application/octet-stream: cabecera de binary_io + matriz float32 por filas
+    - application/vnd.apache.arrow.stream: stream Arrow IPC (requiere pyarrow)
+    
+    La respuesta usa el mismo formato, con las columnas probability_suitable
+    e is_suitable.
+    """
+    if binary_io is None:
+        raise HTTPException(status_code=501, detail="El endpoint binario requiere numpy")
+    require_ready()
+    
+    body = await request.body()
+    scoring_model, tier_used = select_model(tier)
+    try:
+        X, fmt = binary_io.decode_request(body, request.headers.get("content-type", ""), scoring_model.feature_names)
+    except binary_io.BinaryFormatError as e:
+        raise HTTPException(status_code=415 if "Content-Type" in str(e) else 422, detail=str(e))
+    
+    # Mismo carril que /predict/batch, en trozos que son vistas de la matriz
+    chunk_size = max(len(X), 1) if use_pool(scoring_model, len(X)) else BINARY_CHUNK_SIZE
+    labels, probability = [], []
+    async with admission.bulk_request():
+        for i in range(0, len(X), chunk_size):
+            async with admission.slot("bulk"):
+                chunk_labels, chunk_probability = await asyncio.to_thread(
+                    score_matrix, scoring_model, X[i:i + chunk_size]
+                )
+            if drift_monitor is not None:
+                drift_monitor.observe_matrix(X[i:i + chunk_size])
+            labels.append(chunk_labels)
+            probability.append(chunk_probability)
     
-    return {"predictions": results}
+    content, media_type = binary_io.encode_response(labels, probability, fmt)
+    return Response(content=content, media_type=media_type, headers={"X-Model-Tier": tier_used})
 
 @app.get("/test")
 async def test_prediction():
@@ -1,19 +1,56 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import time
+from itertools import chain
+from operator import itemgetter
+
+from compact_forest import DERIVED_FEATURES, PRUNED_DIR, add_derived_features, export_forest, load_forest
+from outcome_log import read_training_table
+from drift import build_reference
+from evaluation import cross_validate, format_summary
+from pruning import compact_forest_model, save_compacted
+from data_prep import format_report, prepare_training_data
+
+# Mínimos de muestras por división y por hoja del bosque (sin pesos)
+MIN_SAMPLES_SPLIT = 5
+MIN_SAMPLES_LEAF = 2
+
+def _leaf_params(weights=None):
+    """
+    Con filas deduplicadas min_samples_* contarían filas únicas, no muestras:
+    el mínimo por hoja se expresa entonces como fracción del peso total. El
+    mínimo por división se mantiene en filas únicas: un nodo con
+    MIN_SAMPLES_SPLIT filas distintas pesa al menos eso, así que el límite
+    original se cumple siempre (solo es más estricto en nodos con pocas
+    filas distintas muy repetidas, que scikit-learn no permite ponderar).
+    """
+    if weights is None:
+        return {'min_samples_split': MIN_SAMPLES_SPLIT, 'min_samples_leaf': MIN_SAMPLES_LEAF,
+                'min_weight_fraction_leaf': 0.0}
+    return {'min_samples_split': MIN_SAMPLES_SPLIT, 'min_samples_leaf': 1,
+            'min_weight_fraction_leaf': MIN_SAMPLES_LEAF / float(np.sum(weights))}
+
+def _atomic_dump(obj, path):
+    """
+    Serializa a un archivo temporal y lo publica con os.replace, para que
+    un fallo a mitad de escritura no deje un artefacto truncado
+    """
+    tmp_path = f'{path}.tmp'
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
 
 class VolunteerMLModel:
     def __init__(self):
         self.model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2,
+            min_samples_split=MIN_SAMPLES_SPLIT,
+            min_samples_leaf=MIN_SAMPLES_LEAF,
             random_state=42
         )
         self.scaler = StandardScaler()
@@ -24,6 +61,33 @@ class VolunteerMLModel:
             'required_hours'
         ]
         self.is_trained = False
+        # Número de actualizaciones incrementales aplicadas desde el último train()
+        self.n_updates = 0
+        # Histogramas de las características de entrenamiento (monitor de deriva)
+        self.drift_reference = None
+        
+        # Evaluación del último entrenamiento (validación cruzada estratificada)
+        self.evaluation = None
+        self.cv_folds = int(os.environ.get('CV_FOLDS', 5))
+        self.cv_workers = int(os.environ.get('CV_WORKERS', 0)) or None
+        # Deduplicar las filas de entrenamiento repetidas (con pesos), ver data_prep.py
+        self.dedup = os.environ.get('TRAIN_DEDUP', '1') == '1'
+        
+        # Evaluación con salida temprana: los árboles se evalúan por bloques y
+        # una fila se detiene cuando los restantes ya no pueden cambiar la decisión
+        self.early_exit = os.environ.get('EARLY_EXIT', '0') == '1'
+        self.early_exit_batch_size = int(os.environ.get('EARLY_EXIT_BATCH_SIZE', 10))
+        self.decision_threshold = float(os.environ.get('DECISION_THRESHOLD', 0.5))
+        self._early_exit_rows = 0
+        self._early_exit_trees = 0
+        
+        # Tabla de contribuciones por nodo para explicaciones (bajo demanda)
+        self._explainer = None
+        
+        # Bosque que se carga: por defecto el compactado si la versión lo trae
+        # (versiones derivadas con compact(); sin salida temprana ni
+        # explicaciones); FOREST_ARTIFACT=sklearn fuerza siempre el pickle completo
+        self.forest_artifact = os.environ.get('FOREST_ARTIFACT', 'auto')
         
     def prepare_features(self, data):
         """
@@ -54,44 +118,87 @@ class VolunteerMLModel:
     def train(self, data_path='data/training_data.csv'):
         """
         Entrena el modelo con los datos
+        
+        Devuelve la accuracy media de la validación cruzada; las métricas
+        completas quedan en self.evaluation
         """
-        # Cargar datos
-        df = pd.read_csv(data_path)
+        # Cargar datos con tipos compactos y sin filas repetidas (cada fila
+        # única pesa tantas veces como aparecía)
+        df, weights, data_report = prepare_training_data(data_path, dedup=self.dedup)
+        print(format_report(data_report))
         
-        # Preparar características
-        X = self.prepare_features(df)
+        # Preparar características (una sola vez para la validación y el ajuste
+        # final) en float64, como al predecir: los tipos compactos son solo de
+        # almacenamiento
+        X = self.prepare_features(df.astype(np.float64))
         y = df['is_suitable']
+        self.model.set_params(**_leaf_params(weights))
         
-        # Dividir datos
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        # Evaluar con validación cruzada estratificada en paralelo
+        self.evaluation = cross_validate(self.model, X.to_numpy(), y.to_numpy(), n_splits=self.cv_folds,
+                                         n_workers=self.cv_workers, sample_weight=weights)
+        
+        # Entrenar el modelo final con todos los datos
+        start = time.perf_counter()
+        X_scaled = self.scaler.fit_transform(X, sample_weight=weights)
+        self.model.fit(X_scaled, y, sample_weight=weights)
+        self.evaluation['timings']['final_fit_seconds'] = time.perf_counter() - start
+        self.evaluation['data_prep'] = data_report
         
-        # Escalar características
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        self.evaluation['feature_importance'] = dict(sorted(
+            zip(X.columns, self.model.feature_importances_.tolist()), key=lambda item: -item[1]
+        ))
+        accuracy = self.evaluation['accuracy']['mean']
+        print(format_summary(self.evaluation))
         
-        # Entrenar modelo
-        self.model.fit(X_train_scaled, y_train)
+        self.drift_reference = build_reference(X.to_numpy(), list(X.columns), weights=weights)
+        self.is_trained = True
+        self.n_updates = 0
+        return accuracy
+    
+    def update(self, data_path, n_new_trees=10):
+        """
+        Actualización incremental con datos nuevos: entrena `n_new_trees`
+        árboles solo sobre esos datos (warm_start) y retira los más antiguos,
+        de modo que el bosque mantiene su tamaño. El escalador no se reajusta.
+        
+        Devuelve la accuracy del modelo previo sobre los datos nuevos
+        (evaluación antes de entrenar con ellos).
+        """
+        if not self.is_trained or not hasattr(self.model, 'estimators_'):
+            raise ValueError("La actualización incremental requiere un RandomForest entrenado")
         
-        # Evaluar
-        y_pred = self.model.predict(X_test_scaled)
-        accuracy = accuracy_score(y_test, y_pred)
+        df = read_training_table(data_path)
+        X_scaled = self.scaler.transform(self.prepare_features(df))
+        y = df['is_suitable']
         
-        print(f"Accuracy: {accuracy:.4f}")
-        print("\nClassification Report:")
-        print(classification_report(y_test, y_pred))
+        if y.nunique() < 2:
+            raise ValueError("Los datos nuevos deben contener ambas clases")
         
-        # Importancia de características
-        feature_importance = pd.DataFrame({
-            'feature': X.columns,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=False)
+        accuracy = accuracy_score(y, self.model.predict(X_scaled))
+        self.evaluation = {'method': 'prequential', 'n_samples': int(len(df)), 'accuracy': float(accuracy)}
         
-        print("\nFeature Importance:")
-        print(feature_importance)
+        n_trees = len(self.model.estimators_)
+        n_new_trees = max(1, min(n_new_trees, n_trees))
+        base_random_state = self.model.random_state
+        self.n_updates += 1
         
-        self.is_trained = True
+        # warm_start añade árboles nuevos; la semilla cambia en cada
+        # actualización para no repetir los mismos bootstraps
+        self.model.set_params(
+            **_leaf_params(),
+            warm_start=True,
+            n_estimators=n_trees + n_new_trees,
+            random_state=None if base_random_state is None else base_random_state + self.n_updates
+        )
+        self.model.fit(X_scaled, y)
+        
+        # Retirar los árboles más antiguos
+        self.model.estimators_ = self.model.estimators_[n_new_trees:]
+        self.model.set_params(warm_start=False, n_estimators=n_trees, random_state=base_random_state)
+        
+        print(f"Actualización incremental: {n_new_trees} árboles nuevos con {len(df)} filas "
+              f"(accuracy previa sobre datos nuevos: {accuracy:.4f})")
         return accuracy
     
     def predict(self, volunteer_data, project_data):
@@ -111,14 +218,240 @@ class VolunteerMLModel:
         X = self.prepare_features(combined_data)
         X_scaled = self.scaler.transform(X)
         
-        # Hacer predicción
-        prediction = self.model.predict(X_scaled)[0]
-        probability = self.model.predict_proba(X_scaled)[0]
+        return self._predict_scaled(X_scaled)[0]
+    
+    def predict_batch(self, pairs):
+        """
+        Predice en lote para una lista de pares (voluntario, proyecto)
+        """
+        if not self.is_trained:
+            raise ValueError("El modelo no ha sido entrenado. Llama a train() primero.")
+        
+        pairs = list(pairs)
+        if not pairs:
+            return []
         
+        return self._predict_scaled(self.scale_pairs(pairs))
+    
+    def scale_pairs(self, pairs):
+        """
+        Versión numpy de prepare_features + scaler.transform para pares
+        (voluntario, proyecto). Como en prepare_features, las características
+        que falten valen 0.
+        """
+        names = self.feature_names
+        n = len(pairs)
+        try:
+            volunteer_values, project_values = itemgetter(*names[:8]), itemgetter(*names[8:])
+            values = chain.from_iterable(volunteer_values(v) + project_values(p) for v, p in pairs)
+            X = np.fromiter(values, dtype=np.float64, count=n * len(names)).reshape(n, len(names))
+        except KeyError:
+            X = np.array([[{**v, **p}.get(name, 0) for name in names] for v, p in pairs], dtype=np.float64)
+        return self.scale_matrix(X)
+    
+    def scale_matrix(self, X):
+        """
+        Versión numpy de prepare_features + scaler.transform para una matriz
+        (n, 11) de características base en el orden de feature_names
+        """
+        X_scaled = add_derived_features(np.asarray(X, dtype=np.float64), self.feature_names)
+        X_scaled -= self.scaler.mean_
+        X_scaled /= self.scaler.scale_
+        return X_scaled
+    
+    def predict_matrix(self, X):
+        """
+        Etiquetas (bool) y probabilidad de ser adecuado para una matriz de
+        características base, sin pasar por pandas ni por dicts
+        """
+        if not self.is_trained:
+            raise ValueError("El modelo no ha sido entrenado. Llama a train() primero.")
+        
+        labels, probability = self._label_scaled(self.scale_matrix(X))
+        suitable = probability[:, 1] if probability.shape[1] > 1 else probability[:, 0]
+        return np.asarray(labels, dtype=bool), suitable
+    
+    def _predict_scaled(self, X_scaled):
+        """
+        Predicción sobre características ya escaladas
+        """
+        return self._results(*self._label_scaled(X_scaled))
+    
+    def _label_scaled(self, X_scaled):
+        """
+        Etiquetas y matriz de probabilidades sobre características ya escaladas
+        """
+        if self.early_exit and hasattr(self.model, 'estimators_') and len(self.model.classes_) == 2:
+            labels, probability = self.predict_proba_early_exit(X_scaled)
+        else:
+            probability = self.model.predict_proba(X_scaled)
+            if self.decision_threshold == 0.5 or probability.shape[1] == 1:
+                # Misma regla que RandomForestClassifier.predict (argmax)
+                labels = self.model.classes_.take(np.argmax(probability, axis=1))
+            else:
+                labels = probability[:, 1] > self.decision_threshold
+        return labels, probability
+    
+    def _results(self, labels, probability):
+        """Convierte etiquetas y probabilidades en la respuesta de predict()"""
+        suitable = probability[:, 1] if probability.shape[1] > 1 else probability[:, 0]
+        return [
+            {'is_suitable': bool(label), 'confidence': float(confidence), 'probability_suitable': float(p)}
+            for label, confidence, p in zip(labels, probability.max(axis=1), suitable)
+        ]
+    
+    def predict_proba_early_exit(self, X_scaled):
+        """
+        Evalúa el bosque por bloques de árboles y detiene cada fila en cuanto
+        los árboles restantes no pueden cambiar su etiqueta.
+        
+        Las etiquetas son idénticas a las de la evaluación completa. Para las
+        filas detenidas antes, la probabilidad es la media de los árboles
+        evaluados (una estimación); para el resto es la exacta.
+        """
+        estimators = self.model.estimators_
+        n_trees = len(estimators)
+        n_rows = X_scaled.shape[0]
+        threshold = self.decision_threshold
+        # Tolerancia frente a errores de redondeo en las sumas parciales
+        eps = 1e-9
+        
+        # Igual que RandomForestClassifier: entrada en float32 y suma árbol a árbol
+        X32 = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        totals = np.zeros((n_rows, len(self.model.classes_)), dtype=np.float64)
+        trees_used = np.zeros(n_rows, dtype=np.int64)
+        labels = np.zeros(n_rows, dtype=bool)
+        active = np.arange(n_rows)
+        
+        for start in range(0, n_trees, self.early_exit_batch_size):
+            X_active = X32[active]
+            block = estimators[start:start + self.early_exit_batch_size]
+            partial = totals[active]
+            for estimator in block:
+                partial += estimator.predict_proba(X_active, check_input=False)
+            totals[active] = partial
+            trees_used[active] += len(block)
+            
+            remaining = n_trees - (start + len(block))
+            if remaining == 0:
+                break
+            
+            # Cada árbol restante mueve (p1 - p0) como mucho en 1 y p1 en [0, 1]
+            if threshold == 0.5:
+                margin = partial[:, 1] - partial[:, 0]
+                sure_yes = margin > remaining + eps
+                sure_no = -margin > remaining + eps
+            else:
+                sure_yes = partial[:, 1] > threshold * n_trees + eps
+                sure_no = partial[:, 1] + remaining < threshold * n_trees - eps
+            
+            labels[active[sure_yes]] = True
+            active = active[~(sure_yes | sure_no)]
+            if len(active) == 0:
+                break
+        
+        # Filas que llegaron al final: regla exacta de la evaluación completa
+        probability = totals / trees_used[:, None]
+        if len(active):
+            final = probability[active]
+            if threshold == 0.5:
+                labels[active] = np.argmax(final, axis=1) == 1
+            else:
+                labels[active] = final[:, 1] > threshold
+        
+        self._early_exit_rows += n_rows
+        self._early_exit_trees += int(trees_used.sum())
+        return labels, probability
+    
+    def _explanation_table(self):
+        """
+        Precalcula, para cada nodo del bosque, la suma de los cambios en la
+        probabilidad de la clase 1 a lo largo del camino raíz -> nodo, asignando
+        cada cambio a la característica con la que divide el padre (atribución
+        de Saabas). Así la explicación de una fila es la suma de las filas de
+        sus hojas, sin recorrer caminos en cada petición.
+        
+        Devuelve (C, offsets, bias): C es (n_nodos_total, n_características) ya
+        dividida por el número de árboles; bias es la media de las raíces.
+        """
+        estimators = self.model.estimators_
+        if self._explainer is not None and self._explainer[0] is estimators:
+            return self._explainer[1:]
+        
+        n_trees = len(estimators)
+        n_features = self.model.n_features_in_
+        tables, offsets = [], []
+        bias = 0.0
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            value = tree.value[:, 0, :]
+            value = value[:, 1] / value.sum(axis=1)
+            
+            # Delta de cada nodo respecto a su padre, en la columna del split del padre
+            parent = np.full(tree.node_count, -1)
+            internal = np.flatnonzero(tree.children_left >= 0)
+            parent[tree.children_left[internal]] = internal
+            parent[tree.children_right[internal]] = internal
+            children = np.flatnonzero(parent >= 0)
+            delta = np.zeros((tree.node_count, n_features))
+            delta[children, tree.feature[parent[children]]] = (
+                value[children] - value[parent[children]]
+            ) / n_trees
+            
+            # Acumular por niveles: tras max_depth pasos cada nodo suma todo su camino
+            table = delta.copy()
+            for _ in range(tree.max_depth):
+                table[children] = delta[children] + table[parent[children]]
+            
+            tables.append(table)
+            offsets.append(offset)
+            bias += value[0] / n_trees
+            offset += tree.node_count
+        
+        self._explainer = (estimators, np.vstack(tables), np.array(offsets), bias)
+        return self._explainer[1:]
+    
+    def explain_scaled(self, X_scaled):
+        """
+        Contribución de cada característica a la probabilidad de ser adecuado
+        para cada fila: bias + contribuciones.sum(axis=1) == probabilidad.
+        Cuesta un recorrido de los árboles (apply) y una suma de filas por árbol.
+        """
+        if not hasattr(self.model, 'estimators_') or len(self.model.classes_) != 2:
+            raise ValueError("Las explicaciones requieren un RandomForest binario de scikit-learn")
+        
+        table, offsets, bias = self._explanation_table()
+        leaves = self.model.apply(np.asarray(X_scaled, dtype=np.float32)) + offsets
+        contributions = np.zeros((leaves.shape[0], table.shape[1]))
+        for t in range(leaves.shape[1]):
+            contributions += table[leaves[:, t]]
+        return bias, contributions
+    
+    def explain_batch(self, pairs):
+        """
+        Explicaciones por característica para una lista de pares (voluntario, proyecto)
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        
+        bias, contributions = self.explain_scaled(self.scale_pairs(pairs))
+        names = self.feature_names + DERIVED_FEATURES
+        return [
+            {'bias': float(bias), 'contributions': dict(zip(names, row))}
+            for row in contributions.tolist()
+        ]
+    
+    def early_exit_stats(self):
+        """Media de árboles evaluados por fila en modo salida temprana"""
         return {
-            'is_suitable': bool(prediction),
-            'confidence': float(max(probability)),
-            'probability_suitable': float(probability[1]) if len(probability) > 1 else float(probability[0])
+            'enabled': self.early_exit,
+            'batch_size': self.early_exit_batch_size,
+            'decision_threshold': self.decision_threshold,
+            'rows': self._early_exit_rows,
+            'avg_trees_per_row': self._early_exit_trees / self._early_exit_rows if self._early_exit_rows else None,
+            'n_estimators': len(getattr(self.model, 'estimators_', []))
         }
     
     def save_model(self, model_dir='models'):
@@ -128,18 +461,46 @@ class VolunteerMLModel:
         if not os.path.exists(model_dir):
             os.makedirs(model_dir)
             
-        joblib.dump(self.model, f'{model_dir}/volunteer_model.pkl')
-        joblib.dump(self.scaler, f'{model_dir}/scaler.pkl')
+        _atomic_dump(self.model, f'{model_dir}/volunteer_model.pkl')
+        _atomic_dump(self.scaler, f'{model_dir}/scaler.pkl')
         
         # Guardar metadatos
         metadata = {
             'feature_names': self.feature_names,
-            'is_trained': self.is_trained
+            'is_trained': self.is_trained,
+            'n_updates': self.n_updates,
+            'drift_reference': self.drift_reference,
+            'evaluation': self.evaluation
         }
-        joblib.dump(metadata, f'{model_dir}/metadata.pkl')
+        _atomic_dump(metadata, f'{model_dir}/metadata.pkl')
+        
+        # Copia en formato compacto (carga rápida, legible sin scikit-learn)
+        self.export_compact(f'{model_dir}/compact')
         
         print(f"Modelo guardado en {model_dir}/")
     
+    def export_compact(self, path='models/compact'):
+        """
+        Exporta el bosque y el escalador a arrays tipados (ver compact_forest.py)
+        """
+        return export_forest(self.model, self.scaler, self.feature_names + DERIVED_FEATURES, path)
+    
+    def compact(self, model_dir='models', data_path='data/training_data.csv', tolerance=0.005, min_trees=10):
+        """
+        Poda el bosque (menos árboles y subárboles de poco valor) dentro de la
+        tolerancia de accuracy indicada, lo pasa a float32 y lo guarda en
+        `model_dir`/compact_pruned (en el registro, el directorio de una versión
+        derivada nueva). Devuelve el informe de tamaño, latencia y accuracy
+        (ver pruning.py).
+        """
+        arrays, header, report = compact_forest_model(self, data_path, tolerance, min_trees)
+        save_compacted(arrays, header, os.path.join(model_dir, PRUNED_DIR))
+        compacted, original = report['compacted'], report['original']
+        print(f"✅ Bosque compactado: {compacted['n_trees']}/{original['n_trees']} árboles, "
+              f"{compacted['n_nodes']}/{original['n_nodes']} nodos, {report['size_ratio']:.1%} del tamaño, "
+              f"accuracy {compacted['accuracy']:.4f} (original {original['accuracy']:.4f})")
+        return report
+    
     def load_model(self, model_dir='models'):
         """
         Carga un modelo previamente entrenado
@@ -151,11 +512,31 @@ class VolunteerMLModel:
             
             self.feature_names = metadata['feature_names']
             self.is_trained = metadata['is_trained']
+            self.n_updates = metadata.get('n_updates', 0)
+            self.drift_reference = metadata.get('drift_reference')
+            self.evaluation = metadata.get('evaluation')
+            
+            pruned_path = os.path.join(model_dir, PRUNED_DIR)
+            if self.forest_artifact != 'sklearn' and os.path.exists(os.path.join(pruned_path, 'header.json')):
+                self.model = load_forest(pruned_path)
+                print("Bosque compactado cargado")
             
             print("Modelo cargado exitosamente")
             return True
         except Exception as e:
             print(f"Error al cargar el modelo: {e}")
+        
+        # Los pickles dependen de la versión de scikit-learn: intentar el formato compacto
+        try:
+            forest = load_forest(f'{model_dir}/compact')
+            self.model = forest
+            self.scaler = forest.scaler
+            self.feature_names = [f for f in forest.feature_names if f not in DERIVED_FEATURES]
+            self.is_trained = True
+            print("Modelo cargado desde el formato compacto")
+            return True
+        except Exception as e:
+            print(f"Error al cargar el modelo compacto: {e}")
             return False
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
 import os
 import json
 import numpy as np
+from itertools import chain
+from operator import itemgetter
+
+from compact_forest import PRUNED_DIR, load_forest, prepare_feature_matrix
+from outcome_log import read_training_table
 
 # Intentar importar scikit-learn, usar fallback si falla
 try:
@@ -15,6 +20,36 @@ except ImportError:
     SKLEARN_AVAILABLE = False
     print("⚠️ scikit-learn no disponible, usando modelo fallback")
 
+# Columnas (y valores por defecto) que usa _simple_predict
+SIMPLE_VOLUNTEER_COLUMNS = (
+    ('reliability', 0.5), ('punctuality', 0.5), ('task_quality', 0.5), ('success_rate', 0.5),
+    ('total_projects', 0), ('completed_projects', 0), ('availability_hours', 0)
+)
+SIMPLE_PROJECT_COLUMNS = (('required_hours', 1), ('project_complexity', 5))
+
+_get_volunteer_columns = itemgetter(*(key for key, _ in SIMPLE_VOLUNTEER_COLUMNS))
+_get_project_columns = itemgetter(*(key for key, _ in SIMPLE_PROJECT_COLUMNS))
+
+def _simple_columns(pairs):
+    """
+    Extrae en una sola pasada las columnas de _simple_predict como una
+    matriz (n, 9). Si falta alguna clave se usan los valores por defecto.
+    """
+    n = len(pairs)
+    width = len(SIMPLE_VOLUNTEER_COLUMNS) + len(SIMPLE_PROJECT_COLUMNS)
+    try:
+        values = chain.from_iterable(
+            _get_volunteer_columns(v) + _get_project_columns(p) for v, p in pairs
+        )
+        return np.fromiter(values, dtype=np.float64, count=n * width).reshape(n, width)
+    except KeyError:
+        values = chain.from_iterable(
+            [v.get(key, default) for key, default in SIMPLE_VOLUNTEER_COLUMNS] +
+            [p.get(key, default) for key, default in SIMPLE_PROJECT_COLUMNS]
+            for v, p in pairs
+        )
+        return np.fromiter(values, dtype=np.float64, count=n * width).reshape(n, width)
+
 class VolunteerMLModel:
     def __init__(self):
         if SKLEARN_AVAILABLE:
@@ -38,6 +73,8 @@ class VolunteerMLModel:
             'required_hours'
         ]
         self.is_trained = False
+        # Bosque en formato compacto: permite usar el modelo entrenado sin sklearn
+        self.compact = None
         
     def _simple_predict(self, volunteer_data, project_data):
         """
@@ -82,6 +119,73 @@ class VolunteerMLModel:
             'probability_suitable': final_score
         }
         
+    def _simple_predict_batch(self, pairs):
+        """
+        Versión vectorizada de _simple_predict: puntúa todos los pares
+        (voluntario, proyecto) a la vez con arrays de numpy
+        """
+        (reliability, punctuality, task_quality, success_rate, total_projects,
+         completed_projects, availability_hours, required_hours, project_complexity) = _simple_columns(pairs).T
+        project_complexity = project_complexity / 10
+        
+        performance_score = (reliability + punctuality + task_quality + success_rate) / 4
+        completion_rate = completed_projects / np.maximum(total_projects, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            availability_ratio = np.minimum(availability_hours / required_hours, 1.0)
+        
+        final_score = (
+            performance_score * 0.4 +
+            completion_rate * 0.3 +
+            availability_ratio * 0.2 +
+            (1 - project_complexity) * 0.1
+        )
+        confidence = np.abs(final_score - 0.5) * 2
+        
+        results = [
+            {'is_suitable': score > 0.6, 'confidence': conf, 'probability_suitable': score}
+            for score, conf in zip(final_score.tolist(), confidence.tolist())
+        ]
+        
+        # Los pares con required_hours == 0 fallan igual que en la versión escalar
+        for i in np.flatnonzero(required_hours == 0):
+            try:
+                results[i] = self._simple_predict(*pairs[i])
+            except Exception as e:
+                results[i] = {'error': str(e)}
+        
+        return results
+    
+    def _compact_predict(self, volunteer_data, project_data):
+        """
+        Predicción con el bosque en formato compacto (solo numpy)
+        """
+        X = prepare_feature_matrix([{**volunteer_data, **project_data}], self.feature_names)
+        probability = self.compact.predict_proba(self.compact.scaler.transform(X))[0]
+        
+        return {
+            'is_suitable': bool(probability[1] > probability[0]),
+            'confidence': float(max(probability)),
+            'probability_suitable': float(probability[1])
+        }
+    
+    def _load_compact(self, path):
+        """
+        Intenta cargar el bosque compacto exportado junto al modelo
+        """
+        compact_path = f'{path}compact'
+        if os.environ.get('FOREST_ARTIFACT') != 'sklearn' and os.path.exists(f'{path}{PRUNED_DIR}'):
+            compact_path = f'{path}{PRUNED_DIR}'
+        if not os.path.exists(os.path.join(compact_path, 'header.json')):
+            return False
+        try:
+            self.compact = load_forest(compact_path)
+            self.is_trained = True
+            print("✅ Bosque compacto cargado (sin scikit-learn)")
+            return True
+        except Exception as e:
+            print(f"❌ Error al cargar bosque compacto: {str(e)}")
+            return False
+    
     def prepare_features(self, data):
         """
         Prepara las características para el modelo
@@ -124,7 +228,7 @@ class VolunteerMLModel:
             import pandas as pd
             
             # Cargar datos
-            data = pd.read_csv(data_path)
+            data = read_training_table(data_path)
             
             # Preparar características
             X = self.prepare_features(data.drop('is_suitable', axis=1))
@@ -161,6 +265,13 @@ class VolunteerMLModel:
         """
         Predice si un voluntario es adecuado para un proyecto
         """
+        if self.compact is not None:
+            try:
+                return self._compact_predict(volunteer_data, project_data)
+            except Exception as e:
+                print(f"❌ Error en predicción compacta: {str(e)}, usando fallback")
+                return self._simple_predict(volunteer_data, project_data)
+            
         if not SKLEARN_AVAILABLE:
             return self._simple_predict(volunteer_data, project_data)
             
@@ -195,6 +306,37 @@ class VolunteerMLModel:
             print(f"❌ Error en predicción ML: {str(e)}, usando fallback")
             return self._simple_predict(volunteer_data, project_data)
     
+    def predict_batch(self, pairs):
+        """
+        Predicción vectorizada sobre una lista de pares (voluntario, proyecto)
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        
+        try:
+            if self.compact is not None:
+                X = prepare_feature_matrix([{**v, **p} for v, p in pairs], self.feature_names)
+                probability = self.compact.predict_proba(self.compact.scaler.transform(X))
+            elif SKLEARN_AVAILABLE and self.is_trained:
+                import pandas as pd
+                
+                features = self.prepare_features(pd.DataFrame([{**v, **p} for v, p in pairs]))
+                probability = self.model.predict_proba(self.scaler.transform(features))
+            else:
+                return self._simple_predict_batch(pairs)
+        except Exception as e:
+            print(f"❌ Error en predicción ML por lotes: {str(e)}, usando fallback")
+            return self._simple_predict_batch(pairs)
+        
+        suitable = probability[:, 1] > probability[:, 0]
+        return [
+            {'is_suitable': is_suitable, 'confidence': confidence, 'probability_suitable': p_suitable}
+            for is_suitable, confidence, p_suitable in zip(
+                suitable.tolist(), probability.max(axis=1).tolist(), probability[:, 1].tolist()
+            )
+        ]
+    
     def save_model(self, path='models/'):
         """
         Guarda el modelo entrenado
@@ -235,6 +377,8 @@ class VolunteerMLModel:
         Carga un modelo previamente entrenado
         """
         if not SKLEARN_AVAILABLE:
+            if self._load_compact(path):
+                return True
             print("⚠️ Carga omitida: scikit-learn no disponible, usando fallback")
             self.is_trained = True
             return True
@@ -262,6 +406,8 @@ class VolunteerMLModel:
                 
         except Exception as e:
             print(f"❌ Error al cargar modelo: {str(e)}")
+            if self._load_compact(path):
+                return True
             # Usar modo fallback
             self.is_trained = True
             return True
@@ -2,6 +2,82 @@ import os
 import json
 import math
 
+# Umbral de decisión de las reglas
+THRESHOLD = 0.6
+
+def _score_pair(volunteer_data, project_data):
+    """
+    Reglas de negocio para un par (voluntario, proyecto): única copia que
+    usan predict() y predict_batch(). Sin llamadas a métodos auxiliares por
+    par; las divisiones y límites equivalen a _safe_divide() y _clamp().
+    """
+    v_get = volunteer_data.get
+    p_get = project_data.get
+    
+    # Extraer datos del voluntario
+    reliability = v_get('reliability', 0.5)
+    punctuality = v_get('punctuality', 0.5)
+    task_quality = v_get('task_quality', 0.5)
+    success_rate = v_get('success_rate', 0.5)
+    total_projects = v_get('total_projects', 0)
+    completed_projects = v_get('completed_projects', 0)
+    total_hours = v_get('total_hours', 0)
+    availability_hours = v_get('availability_hours', 0)
+    
+    # Extraer datos del proyecto
+    project_duration = p_get('project_duration', 1)
+    project_complexity = p_get('project_complexity', 5)
+    required_hours = p_get('required_hours', 1)
+    
+    # REGLA 1: Score de performance (40% del peso)
+    performance_score = (reliability + punctuality + task_quality + success_rate) / 4
+    
+    # REGLA 2: Score de experiencia (25% del peso)
+    try:
+        completion_rate = completed_projects / total_projects if total_projects != 0 else 0.5
+    except Exception:
+        completion_rate = 0.5
+    experience_factor = min(total_projects / 10, 1.0)  # Máximo a los 10 proyectos
+    hours_factor = min(total_hours / 1000, 1.0)  # Máximo a las 1000 horas
+    experience_score = (completion_rate * 0.6 + experience_factor * 0.2 + hours_factor * 0.2)
+    
+    # REGLA 3: Score de disponibilidad (25% del peso)
+    try:
+        availability_ratio = availability_hours / required_hours if required_hours != 0 else 0
+    except Exception:
+        availability_ratio = 0
+    availability_score = min(availability_ratio, 1.0)  # Máximo 1.0
+    
+    # REGLA 4: Factor de complejidad del proyecto (10% del peso)
+    # Proyectos más simples son más fáciles de completar
+    complexity_factor = (10 - project_complexity) / 10  # Invertir escala
+    
+    # CÁLCULO FINAL
+    final_score = (
+        performance_score * 0.4 +
+        experience_score * 0.25 +
+        availability_score * 0.25 +
+        complexity_factor * 0.1
+    )
+    
+    # Ajustar por duración del proyecto
+    if project_duration > 12:  # Proyectos largos requieren más compromiso
+        final_score *= 0.9
+    elif project_duration < 4:  # Proyectos cortos son más flexibles
+        final_score *= 1.1
+    
+    # Limitar score entre 0 y 1
+    final_score = max(0, min(1, final_score))
+    
+    # CONFIANZA: qué tan lejos está del threshold (mínimo 50%)
+    confidence = max(0.5, min(1.0, abs(final_score - THRESHOLD) * 2))
+    
+    return {
+        'is_suitable': final_score >= THRESHOLD,
+        'confidence': float(confidence),
+        'probability_suitable': float(final_score)
+    }
+
 class VolunteerMLModel:
     """
     Modelo ML ultra-simple que funciona SIN dependencias externas
@@ -30,76 +106,10 @@ class VolunteerMLModel:
     
     def predict(self, volunteer_data, project_data):
         """
-        Predicción basada en reglas de negocio simples
+        Predicción basada en reglas de negocio simples (ver _score_pair)
         """
         try:
-            # Extraer datos del voluntario
-            reliability = volunteer_data.get('reliability', 0.5)
-            punctuality = volunteer_data.get('punctuality', 0.5)
-            task_quality = volunteer_data.get('task_quality', 0.5)
-            success_rate = volunteer_data.get('success_rate', 0.5)
-            total_projects = volunteer_data.get('total_projects', 0)
-            completed_projects = volunteer_data.get('completed_projects', 0)
-            total_hours = volunteer_data.get('total_hours', 0)
-            availability_hours = volunteer_data.get('availability_hours', 0)
-            
-            # Extraer datos del proyecto
-            project_duration = project_data.get('project_duration', 1)
-            project_complexity = project_data.get('project_complexity', 5)
-            required_hours = project_data.get('required_hours', 1)
-            
-            # REGLA 1: Score de performance (40% del peso)
-            performance_score = (reliability + punctuality + task_quality + success_rate) / 4
-            performance_weight = 0.4
-            
-            # REGLA 2: Score de experiencia (25% del peso)
-            completion_rate = self._safe_divide(completed_projects, total_projects, 0.5)
-            experience_factor = min(total_projects / 10, 1.0)  # Máximo a los 10 proyectos
-            hours_factor = min(total_hours / 1000, 1.0)  # Máximo a las 1000 horas
-            experience_score = (completion_rate * 0.6 + experience_factor * 0.2 + hours_factor * 0.2)
-            experience_weight = 0.25
-            
-            # REGLA 3: Score de disponibilidad (25% del peso)
-            availability_ratio = self._safe_divide(availability_hours, required_hours, 0)
-            availability_score = min(availability_ratio, 1.0)  # Máximo 1.0
-            availability_weight = 0.25
-            
-            # REGLA 4: Factor de complejidad del proyecto (10% del peso)
-            # Proyectos más simples son más fáciles de completar
-            complexity_factor = (10 - project_complexity) / 10  # Invertir escala
-            complexity_weight = 0.1
-            
-            # CÁLCULO FINAL
-            final_score = (
-                performance_score * performance_weight +
-                experience_score * experience_weight +
-                availability_score * availability_weight +
-                complexity_factor * complexity_weight
-            )
-            
-            # Ajustar por duración del proyecto
-            if project_duration > 12:  # Proyectos largos requieren más compromiso
-                final_score *= 0.9
-            elif project_duration < 4:  # Proyectos cortos son más flexibles
-                final_score *= 1.1
-                
-            # Limitar score entre 0 y 1
-            final_score = self._clamp(final_score, 0, 1)
-            
-            # DECISIÓN
-            threshold = 0.6
-            is_suitable = final_score >= threshold
-            
-            # CONFIANZA: qué tan lejos está del threshold
-            confidence = abs(final_score - threshold) * 2
-            confidence = self._clamp(confidence, 0.5, 1.0)  # Mínimo 50% de confianza
-            
-            return {
-                'is_suitable': is_suitable,
-                'confidence': float(confidence),
-                'probability_suitable': float(final_score)
-            }
-            
+            return _score_pair(volunteer_data, project_data)
         except Exception as e:
             # Fallback ultra-conservador
             print(f"Error en predicción: {e}")
@@ -109,6 +119,24 @@ class VolunteerMLModel:
                 'probability_suitable': 0.6
             }
     
+    def predict_batch(self, pairs):
+        """
+        Predicción en lote sobre una lista de pares (voluntario, proyecto):
+        las mismas reglas que predict() sin el coste de su llamada por par
+        """
+        results = []
+        append = results.append
+        score = _score_pair
+        
+        for volunteer_data, project_data in pairs:
+            try:
+                append(score(volunteer_data, project_data))
+            except Exception:
+                # Mismo fallback conservador (y mensaje) que predict()
+                append(self.predict(volunteer_data, project_data))
+        
+        return results
+
     def train(self, data_path=None):
         """
         Simulación de entrenamiento (no hace nada real)
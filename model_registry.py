@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+
+# Archivos de los que se puede cargar un modelo real: una versión sin
+# ninguno (p. ej. los niveles sin scikit-learn, que no guardan nada) no se registra
+MODEL_ARTIFACTS = ('volunteer_model.pkl', os.path.join('compact', 'header.json'))
+
+# Archivos de una versión que pueden cambiar tras publicarla y no entran en el
+# hash de contenido: los metadatos y la referencia de deriva recalculada
+MUTABLE_FILES = ('version.json', 'drift_reference.json')
+
+
+class ModelRegistry:
+    """
+    Registro versionado de modelos en disco
+
+    Estructura:
+        models/versions/<version>/   artefactos de cada versión + version.json
+        models/current.json          puntero a la versión activa (con historial)
+
+    Cada versión se escribe en un directorio temporal y se publica con un
+    rename atómico; la promoción reescribe el puntero con os.replace, así que
+    un fallo a mitad de /retrain nunca deja artefactos mezclados en disco.
+    """
+    def __init__(self, model_factory, base_dir='models', max_loaded=3, history_size=10):
+        self.model_factory = model_factory
+        self.base_dir = base_dir
+        self.versions_dir = os.path.join(base_dir, 'versions')
+        self.pointer_path = os.path.join(base_dir, 'current.json')
+        self.max_loaded = max_loaded
+        self.history_size = history_size
+        self._loaded = {}  # version -> modelo ya cargado en memoria
+        self._lock = threading.Lock()
+
+    def _version_path(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    @staticmethod
+    def _hash_file(path):
+        """SHA-256 de un archivo leído por bloques"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _content_hash(self, directory):
+        """Hash del contenido de todos los artefactos de una versión"""
+        digest = hashlib.sha256()
+        for root, _, files in sorted(os.walk(directory)):
+            for name in sorted(files):
+                if name.split('.tmp-')[0] in MUTABLE_FILES:
+                    continue
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, directory).encode())
+                digest.update(self._hash_file(path).encode())
+        return digest.hexdigest()
+
+    def _data_hash(self, data_path):
+        """Hash de los datos de entrenamiento: un archivo o un directorio de partes"""
+        if not data_path or not os.path.exists(data_path):
+            return None
+        if os.path.isdir(data_path):
+            return self._content_hash(data_path)
+        return self._hash_file(data_path)
+
+    @staticmethod
+    def _write_json_atomic(path, data):
+        """Escribe JSON en un temporal y lo publica con os.replace"""
+        tmp_path = f'{path}.tmp-{uuid.uuid4().hex}'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _publish(self, tmp_dir, metadata):
+        """
+        Calcula el hash del contenido de `tmp_dir`, escribe version.json y lo
+        publica como versión con un rename atómico. Devuelve los metadatos.
+        """
+        if not any(os.path.exists(os.path.join(tmp_dir, name)) for name in MODEL_ARTIFACTS):
+            raise ValueError("El modelo no ha guardado artefactos cargables; no se registra la versión")
+
+        content_hash = self._content_hash(tmp_dir)
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{content_hash[:8]}"
+        metadata = {'version': version, 'content_hash': content_hash, 'created_at': time.time(), **metadata}
+        self._write_json_atomic(os.path.join(tmp_dir, 'version.json'), metadata)
+        os.rename(tmp_dir, self._version_path(version))
+        return metadata
+
+    def register(self, model, accuracy=None, data_path=None, timings=None, extra=None):
+        """
+        Guarda un modelo entrenado como una nueva versión inmutable
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        tmp_dir = self._version_path(f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(tmp_dir)
+
+        try:
+            start = time.perf_counter()
+            model.save_model(tmp_dir + os.sep)
+            save_seconds = time.perf_counter() - start
+
+            metadata = self._publish(tmp_dir, {
+                'model_class': f'{type(model).__module__}.{type(model).__name__}',
+                'accuracy': float(accuracy) if accuracy is not None else None,
+                'data_path': data_path,
+                'data_hash': self._data_hash(data_path),
+                'timings': {**(timings or {}), 'save_seconds': save_seconds},
+                **(extra or {})
+            })
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        version = metadata['version']
+
+        # El modelo recién entrenado ya está en memoria: queda precargado
+        with self._lock:
+            self._loaded[version] = model
+            self._evict()
+
+        print(f"✅ Versión de modelo registrada: {version}")
+        return metadata
+
+    def derive(self, parent_version, write_artifacts):
+        """
+        Publica una versión nueva a partir de otra registrada sin modificarla:
+        se copian sus artefactos, `write_artifacts(directorio)` añade los
+        derivados (bosque podado, modelo destilado...) y devuelve los metadatos
+        extra, y la copia se publica con su propio hash de contenido.
+        """
+        parent_path = self._version_path(parent_version)
+        if not os.path.isdir(parent_path):
+            raise KeyError(f"Versión no encontrada: {parent_version}")
+        parent = self.get_metadata(parent_version)
+
+        tmp_dir = self._version_path(f'.tmp-{uuid.uuid4().hex}')
+        try:
+            shutil.copytree(parent_path, tmp_dir, ignore=shutil.ignore_patterns('version.json'))
+            start = time.perf_counter()
+            extra = write_artifacts(tmp_dir + os.sep) or {}
+            inherited = {key: value for key, value in parent.items()
+                         if key not in ('version', 'content_hash', 'created_at', 'timings', 'loaded')}
+            metadata = self._publish(tmp_dir, {
+                **inherited,
+                'parent_version': parent_version,
+                'timings': {'derive_seconds': time.perf_counter() - start},
+                **extra
+            })
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        print(f"✅ Versión derivada de {parent_version} registrada: {metadata['version']}")
+        return metadata
+
+    def get_metadata(self, version):
+        """Metadatos de una versión registrada"""
+        path = os.path.join(self._version_path(version), 'version.json')
+        if not os.path.exists(path):
+            raise KeyError(f"Versión no encontrada: {version}")
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def list_versions(self):
+        """Lista las versiones registradas, de la más antigua a la más reciente"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+
+        versions = []
+        for name in os.listdir(self.versions_dir):
+            if name.startswith('.'):
+                continue
+            try:
+                metadata = self.get_metadata(name)
+            except (KeyError, ValueError):
+                continue
+            metadata['loaded'] = name in self._loaded
+            versions.append(metadata)
+        return sorted(versions, key=lambda m: m['created_at'])
+
+    def _read_pointer(self):
+        if not os.path.exists(self.pointer_path):
+            return {'version': None, 'history': []}
+        with open(self.pointer_path, 'r') as f:
+            return json.load(f)
+
+    def current_version(self):
+        """Versión apuntada como activa (None si no hay registro)"""
+        return self._read_pointer().get('version')
+
+    def preload(self, version):
+        """
+        Carga una versión en memoria sin activarla, para que el cambio
+        posterior no pague tiempo de carga en el camino de la petición
+        """
+        with self._lock:
+            if version in self._loaded:
+                return self._loaded[version]
+
+        path = self._version_path(version)
+        if not os.path.isdir(path):
+            raise KeyError(f"Versión no encontrada: {version}")
+
+        candidate = self.model_factory()
+        if not candidate.load_model(path + os.sep):
+            raise RuntimeError(f"No se pudo cargar la versión {version}")
+
+        with self._lock:
+            self._loaded.setdefault(version, candidate)
+            self._evict()
+            return self._loaded[version]
+
+    def _evict(self):
+        """Mantiene acotado el número de versiones en memoria"""
+        pointer = self._read_pointer()
+        keep = {pointer.get('version')}
+        keep.update(pointer.get('history', [])[-1:])
+        for version in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if version not in keep:
+                del self._loaded[version]
+
+    def promote(self, version):
+        """
+        Activa una versión: se precarga primero y luego se cambia el puntero
+        de forma atómica. Devuelve el modelo ya cargado.
+        """
+        candidate = self.preload(version)
+
+        with self._lock:
+            pointer = self._read_pointer()
+            history = pointer.get('history', [])
+            if pointer.get('version') and pointer['version'] != version:
+                history = (history + [pointer['version']])[-self.history_size:]
+            self._write_json_atomic(self.pointer_path, {
+                'version': version,
+                'history': history,
+                'promoted_at': time.time()
+            })
+
+        print(f"✅ Versión promovida: {version}")
+        return candidate
+
+    def previous_version(self):
+        """Versión a la que volvería rollback() (ValueError si no hay)"""
+        history = self._read_pointer().get('history', [])
+        if not history:
+            raise ValueError("No hay versión anterior a la que volver")
+        return history[-1]
+
+    def rollback(self):
+        """
+        Vuelve a la versión activa anterior. Devuelve (versión, modelo).
+        """
+        previous = self.previous_version()
+        candidate = self.preload(previous)
+        pointer = self._read_pointer()
+        history = pointer.get('history', [])
+
+        with self._lock:
+            self._write_json_atomic(self.pointer_path, {
+                'version': previous,
+                'history': history[:-1],
+                'promoted_at': time.time()
+            })
+
+        print(f"↩️ Rollback a la versión: {previous}")
+        return previous, candidate
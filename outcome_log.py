@@ -0,0 +1,311 @@
+import os
+import sys
+import glob
+import time
+import zlib
+import struct
+import threading
+from array import array
+
+# El log en sí solo usa la librería estándar; la compactación al formato
+# columnar requiere numpy
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Columnas de un resultado real de asignación: las 11 características + etiqueta
+OUTCOME_COLUMNS = [
+    'reliability', 'punctuality', 'task_quality', 'success_rate',
+    'total_projects', 'completed_projects', 'total_hours',
+    'availability_hours', 'project_duration', 'project_complexity',
+    'required_hours', 'is_suitable'
+]
+
+# Registro del log: cabecera fija + n_filas * n_columnas float64 little-endian
+RECORD_MAGIC = b'VOL1'
+RECORD_HEADER = struct.Struct('<4sIII')  # magic, n_rows, n_cols, crc32 del payload
+
+
+def _encode_batch(rows):
+    """Serializa un lote de filas en un único registro binario"""
+    values = array('d')
+    for row in rows:
+        if len(row) != len(OUTCOME_COLUMNS):
+            raise ValueError(f"Cada resultado debe tener {len(OUTCOME_COLUMNS)} columnas")
+        values.extend(row)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    payload = values.tobytes()
+    return RECORD_HEADER.pack(RECORD_MAGIC, len(rows), len(OUTCOME_COLUMNS), zlib.crc32(payload)) + payload
+
+
+def read_segment(path):
+    """
+    Lee los registros válidos de un segmento. Un registro incompleto o con
+    CRC incorrecto (escritura interrumpida) termina la lectura del segmento.
+    """
+    batches = []
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        magic, n_rows, n_cols, crc = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + n_rows * n_cols * 8
+        if magic != RECORD_MAGIC or n_cols != len(OUTCOME_COLUMNS) or end > len(data):
+            break
+        payload = data[start:end]
+        if zlib.crc32(payload) != crc:
+            break
+        batches.append(payload)
+        offset = end
+
+    if offset != len(data):
+        print(f"⚠️ Segmento {path} truncado: se ignoran {len(data) - offset} bytes finales")
+    return batches
+
+
+def _part_range(path):
+    first, last = os.path.basename(path)[5:-4].split('-')
+    return int(first), int(last)
+
+
+def table_parts(table_dir):
+    """
+    Partes vigentes del conjunto columnar, en orden. Cada parte se llama
+    `part-<primero>-<último>.npz` por el rango de segmentos del log que
+    contiene; al fusionar partes se escribe una con la unión de sus rangos
+    y, si la fusión se interrumpe antes de borrar las originales, las que
+    quedan cubiertas por ella se ignoran.
+    """
+    parts = sorted(glob.glob(os.path.join(table_dir, 'part-*.npz')),
+                   key=lambda path: (_part_range(path)[0], -_part_range(path)[1]))
+    live, covered = [], -1
+    for path in parts:
+        first, last = _part_range(path)
+        if last <= covered:
+            continue
+        live.append(path)
+        covered = last
+    return live
+
+
+def read_training_table(data_path):
+    """
+    Carga un conjunto de entrenamiento como DataFrame: CSV, un archivo
+    columnar (.npz) o el directorio de partes .npz que produce la
+    compactación del log de resultados (se concatenan al leerlo)
+    """
+    import pandas as pd
+
+    if os.path.isdir(data_path):
+        chunks = []
+        for path in table_parts(data_path):
+            with np.load(path) as columns:
+                chunks.append({name: columns[name] for name in columns.files})
+        if not chunks:
+            return pd.DataFrame(columns=OUTCOME_COLUMNS)
+        return pd.DataFrame({name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]})
+    if data_path.endswith('.npz'):
+        with np.load(data_path) as columns:
+            return pd.DataFrame({name: columns[name] for name in columns.files})
+    return pd.read_csv(data_path)
+
+
+class OutcomeLog:
+    """
+    Log de solo-anexado para resultados reales de asignaciones
+
+    Cada llamada a append() escribe un único registro binario (una syscall)
+    en el segmento activo. compact() sella el segmento activo y vuelca los
+    segmentos sellados a una parte nueva del conjunto columnar `table/` que
+    consume train(): el coste de cada compactación depende solo de las filas
+    nuevas. Cuando hay más de `max_parts` partes se fusionan en una sola.
+
+    El nombre de cada parte registra los segmentos que contiene: si el
+    proceso termina después de publicar una parte y antes de borrar sus
+    segmentos, al reabrir el log esos segmentos se descartan en lugar de
+    volver a compactarse (las filas no se duplican).
+    """
+    def __init__(self, log_dir='data/outcomes', fsync=False, max_parts=32):
+        self.log_dir = log_dir
+        self.table_path = os.path.join(log_dir, 'table')
+        self.fsync = fsync
+        self.max_parts = max_parts
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._file = None
+        self.pending_rows = 0
+        self.appended_rows = 0
+        self.compacted_rows = 0
+        self.last_compaction = None
+
+        os.makedirs(self.table_path, exist_ok=True)
+        legacy_path = os.path.join(log_dir, 'outcomes.npz')
+        if os.path.exists(legacy_path) and not table_parts(self.table_path):
+            self._migrate_legacy(legacy_path)
+
+        # Segmentos ya incluidos en una parte (compactación interrumpida antes de borrarlos)
+        parts = table_parts(self.table_path)
+        covered = max((_part_range(path)[1] for path in parts), default=-1)
+        for path in self._segments():
+            if self._segment_seq(path) <= covered:
+                print(f"⚠️ Segmento {path} ya compactado: se elimina")
+                os.remove(path)
+
+        # Nunca se anexa a un segmento previo (podría tener una cola truncada)
+        # ni se reutiliza un número de segmento ya cubierto por una parte
+        existing = self._segments()
+        self._seq = max(self._segment_seq(existing[-1]) if existing else -1, covered) + 1
+        self.pending_rows = sum(
+            len(payload) // (8 * len(OUTCOME_COLUMNS))
+            for path in existing for payload in read_segment(path)
+        )
+
+    def _migrate_legacy(self, legacy_path):
+        """
+        El conjunto de una sola pieza de versiones anteriores pasa a ser la
+        parte del segmento 0; los segmentos pendientes se renumeran a partir
+        del 1 para que no queden cubiertos por ella
+        """
+        for path in reversed(self._segments()):
+            os.replace(path, self._segment_path(self._segment_seq(path) + 1))
+        os.replace(legacy_path, self._part_path(0, 0))
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.log_dir, 'wal-*.log')))
+
+    @staticmethod
+    def _segment_seq(path):
+        return int(os.path.basename(path)[4:-4])
+
+    def _segment_path(self, seq):
+        return os.path.join(self.log_dir, f'wal-{seq:08d}.log')
+
+    def _part_path(self, first, last):
+        return os.path.join(self.table_path, f'part-{first:08d}-{last:08d}.npz')
+
+    def append(self, rows):
+        """Anexa un lote de filas (secuencias en el orden de OUTCOME_COLUMNS)"""
+        if not rows:
+            return 0
+        record = _encode_batch(rows)
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._segment_path(self._seq), 'ab', buffering=0)
+            self._file.write(record)
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.pending_rows += len(rows)
+            self.appended_rows += len(rows)
+        return len(rows)
+
+    def _seal_active(self):
+        """Cierra el segmento activo; los siguientes append() abren uno nuevo"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self._segment_path(self._seq)):
+                self._seq += 1
+            pending = self.pending_rows
+            self.pending_rows = 0
+            return pending
+
+    @staticmethod
+    def _write_part(path, columns):
+        """Escribe una parte en un temporal y la publica con os.replace"""
+        tmp_path = os.path.join(os.path.dirname(path), f'.tmp-{os.path.basename(path)}')
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, path)
+
+    @property
+    def can_compact(self):
+        return np is not None
+
+    def compact(self):
+        """
+        Vuelca los segmentos sellados a una parte nueva del conjunto columnar
+        y los elimina
+        """
+        if not self.can_compact:
+            raise RuntimeError("La compactación del log de resultados requiere numpy")
+        with self._compact_lock:
+            start = time.perf_counter()
+            sealed_pending = self._seal_active()
+            segments = [path for path in self._segments() if self._segment_seq(path) < self._seq]
+            if not segments:
+                return {'compacted_rows': 0, 'total_rows': self._table_rows(), 'seconds': 0.0}
+
+            try:
+                payloads = [payload for path in segments for payload in read_segment(path)]
+                new_rows = np.frombuffer(b''.join(payloads), dtype='<f8').reshape(-1, len(OUTCOME_COLUMNS))
+                if len(new_rows):
+                    columns = {name: new_rows[:, i] for i, name in enumerate(OUTCOME_COLUMNS)}
+                    columns['is_suitable'] = columns['is_suitable'].astype(np.int8)
+                    self._write_part(self._part_path(self._segment_seq(segments[0]),
+                                                     self._segment_seq(segments[-1])), columns)
+            except Exception:
+                with self._lock:
+                    self.pending_rows += sealed_pending
+                raise
+
+            for path in segments:
+                os.remove(path)
+
+            merged_parts = self._merge_parts() if len(table_parts(self.table_path)) > self.max_parts else 0
+
+            self.compacted_rows += len(new_rows)
+            self.last_compaction = time.time()
+            result = {
+                'compacted_rows': len(new_rows),
+                'total_rows': self._table_rows(),
+                'parts': len(table_parts(self.table_path)),
+                'merged_parts': merged_parts,
+                'seconds': time.perf_counter() - start
+            }
+            print(f"✅ Log de resultados compactado: {result['compacted_rows']} filas nuevas, "
+                  f"{result['total_rows']} en total")
+            return result
+
+    def _merge_parts(self):
+        """
+        Fusiona todas las partes en una (cada max_parts compactaciones, así
+        que el coste de reescribir el conjunto se reparte entre ellas)
+        """
+        parts = table_parts(self.table_path)
+        table = read_training_table(self.table_path)
+        first, last = _part_range(parts[0])[0], _part_range(parts[-1])[1]
+        self._write_part(self._part_path(first, last), {name: table[name].to_numpy() for name in table.columns})
+        for path in parts:
+            if _part_range(path) != (first, last):
+                os.remove(path)
+        return len(parts)
+
+    def _table_rows(self):
+        rows = 0
+        for path in table_parts(self.table_path):
+            with np.load(path) as table:
+                rows += len(table['is_suitable'])
+        return rows
+
+    def stats(self):
+        return {
+            'log_dir': self.log_dir,
+            'table_path': self.table_path,
+            'table_parts': len(table_parts(self.table_path)),
+            'pending_rows': self.pending_rows,
+            'appended_rows': self.appended_rows,
+            'compacted_rows': self.compacted_rows,
+            'segments': len(self._segments()),
+            'last_compaction': self.last_compaction
+        }
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,236 @@
+import time
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+from compact_forest import ARRAY_DTYPES, DERIVED_FEATURES, CompactForest, forest_arrays, write_compact
+from outcome_log import read_training_table
+
+PRUNE_EPSILONS = (0.0, 0.01, 0.02, 0.05, 0.1)
+COMPACT_DTYPES = {'value': np.float32}
+
+
+def _levels(arrays, max_depth):
+    """Profundidad de cada nodo alcanzable desde las raíces (-1 si no se alcanza)"""
+    left, right = arrays['children_left'], arrays['children_right']
+    depth = np.full(len(left), -1)
+    frontier = np.asarray(arrays['roots'])
+    for level in range(max_depth + 1):
+        depth[frontier] = level
+        frontier = frontier[left[frontier] >= 0]
+        if not len(frontier):
+            break
+        frontier = np.concatenate([left[frontier], right[frontier]])
+    return depth
+
+
+def prune_subtrees(arrays, header, epsilon):
+    """
+    Convierte en hoja cada nodo interno cuyas hojas se alejan como mucho
+    `epsilon` de la distribución de clases del propio nodo, y elimina los
+    nodos que dejan de ser alcanzables. Con epsilon=0 solo desaparecen los
+    subárboles que no cambian ninguna probabilidad.
+    """
+    feature = np.asarray(arrays['feature'])
+    left = np.asarray(arrays['children_left'])
+    right = np.asarray(arrays['children_right'])
+    value = np.asarray(arrays['value'], dtype=np.float64)
+    internal = np.flatnonzero(left >= 0)
+
+    # Mínimo y máximo de las hojas de cada subárbol, de abajo arriba
+    is_leaf = (left < 0)[:, None]
+    low = np.where(is_leaf, value, np.inf)
+    high = np.where(is_leaf, value, -np.inf)
+    for _ in range(header['max_depth']):
+        low[internal] = np.minimum(low[left[internal]], low[right[internal]])
+        high[internal] = np.maximum(high[left[internal]], high[right[internal]])
+    deviation = np.maximum(high - value, value - low).max(axis=1)
+
+    collapse = np.zeros(len(feature), dtype=bool)
+    collapse[internal] = deviation[internal] <= epsilon + 1e-12
+    pruned = {
+        'feature': np.where(collapse, -1, feature),
+        'children_left': np.where(collapse, -1, left),
+        'children_right': np.where(collapse, -1, right),
+        'roots': np.asarray(arrays['roots'])
+    }
+
+    # Renumerar los nodos alcanzables conservando el orden (cada árbol sigue contiguo)
+    depth = _levels(pruned, header['max_depth'])
+    keep = np.flatnonzero(depth >= 0)
+    new_index = np.full(len(feature), -1)
+    new_index[keep] = np.arange(len(keep))
+
+    def remap(children):
+        children = children[keep]
+        return np.where(children >= 0, new_index[np.maximum(children, 0)], -1)
+
+    result = {
+        'feature': pruned['feature'][keep],
+        'threshold': np.asarray(arrays['threshold'])[keep],
+        'children_left': remap(pruned['children_left']),
+        'children_right': remap(pruned['children_right']),
+        'value': value[keep],
+        'roots': new_index[pruned['roots']],
+        'scaler_mean': arrays['scaler_mean'],
+        'scaler_scale': arrays['scaler_scale']
+    }
+    return result, {**header, 'n_nodes': int(len(keep)), 'max_depth': int(depth.max())}
+
+
+def select_trees(arrays, header, n_trees):
+    """Primeros `n_trees` árboles del bosque (los nodos de cada árbol son contiguos)"""
+    roots = np.asarray(arrays['roots'])
+    if n_trees >= len(roots):
+        return arrays, header
+    end = int(roots[n_trees])
+    selected = {name: np.asarray(arrays[name])[:end] for name in
+                ('feature', 'threshold', 'children_left', 'children_right', 'value')}
+    selected.update(roots=roots[:n_trees], scaler_mean=arrays['scaler_mean'],
+                    scaler_scale=arrays['scaler_scale'])
+    return selected, {**header, 'n_estimators': int(n_trees), 'n_nodes': end}
+
+
+def size_bytes(arrays, dtypes=None):
+    """Tamaño en disco (y en memoria) de los arrays con los tipos del formato"""
+    dtypes = {**ARRAY_DTYPES, **(dtypes or {})}
+    return int(sum(len(np.asarray(arrays[name]).reshape(-1)) * np.dtype(dtype).itemsize
+                   for name, dtype in dtypes.items()))
+
+
+def _tree_probabilities(arrays, header, X_scaled, positive):
+    """Probabilidad de la clase positiva de cada árbol: (n_filas, n_árboles)"""
+    forest = CompactForest(header, arrays)
+    leaves = forest.apply(X_scaled)
+    return forest.value[leaves, positive]
+
+
+def _latency(predict_proba, X_scaled, repeats=200):
+    """Milisegundos por lote completo y por fila individual (mediana)"""
+    predict_proba(X_scaled[:1])
+    start = time.perf_counter()
+    predict_proba(X_scaled)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    single = []
+    for i in range(min(repeats, len(X_scaled))):
+        start = time.perf_counter()
+        predict_proba(X_scaled[i:i + 1])
+        single.append(time.perf_counter() - start)
+    return {'batch_ms': batch_ms, 'single_ms': float(np.median(single)) * 1000}
+
+
+def _metrics(y, probability):
+    return {'accuracy': float(((probability > 0.5) == y).mean()), 'roc_auc': float(roc_auc_score(y, probability))}
+
+
+def compact_forest_model(model, data_path='data/training_data.csv', tolerance=0.005, min_trees=10,
+                         epsilons=PRUNE_EPSILONS, n_samples=20000, seed=42):
+    """
+    Busca la versión más pequeña del bosque de `model` (menos árboles y
+    subárboles podados) que cumple, con margen `tolerance` respecto al
+    bosque completo:
+      - accuracy y ROC-AUC sobre los datos etiquetados de `data_path`
+      - acuerdo de etiquetas con el bosque completo sobre `n_samples` filas
+        sintéticas de generate_data.py (como en la destilación), que evita
+        quedarse solo con lo que el bosque ya vio al entrenar
+    y la pasa a float32.
+
+    Devuelve (arrays, header, report) listos para save_compacted.
+    """
+    forest = model.model
+    if not hasattr(forest, 'estimators_'):
+        raise ValueError("La compactación requiere un RandomForest entrenado de scikit-learn")
+    if not 0 <= tolerance < 1:
+        raise ValueError("La tolerancia debe estar en [0, 1)")
+
+    from generate_data import generate_training_data
+
+    df = read_training_table(data_path)
+    X_scaled = np.asarray(model.scaler.transform(model.prepare_features(df)), dtype=np.float64)
+    y = df['is_suitable'].to_numpy().astype(int)
+    if len(np.unique(y)) < 2:
+        raise ValueError("Los datos de evaluación deben contener ambas clases")
+    X_check = np.asarray(model.scaler.transform(model.prepare_features(generate_training_data(n_samples, seed=seed))),
+                         dtype=np.float64)
+    positive = list(forest.classes_).index(1)
+
+    start = time.perf_counter()
+    arrays, header = forest_arrays(forest, model.scaler, model.feature_names + DERIVED_FEATURES)
+    n_trees = len(forest.estimators_)
+    min_trees = max(1, min(min_trees, n_trees))
+    full_probability = _tree_probabilities(arrays, header, X_scaled, positive).mean(axis=1)
+    full_check = _tree_probabilities(arrays, header, X_check, positive).mean(axis=1) > 0.5
+    baseline = _metrics(y, full_probability)
+
+    # Para cada epsilon, la probabilidad acumulada de los k primeros árboles
+    # da las métricas de todos los tamaños de bosque con un solo recorrido
+    best = None
+    for epsilon in epsilons:
+        pruned, pruned_header = prune_subtrees(arrays, header, epsilon)
+        roots = np.append(pruned['roots'], pruned_header['n_nodes'])
+        cumulative = np.cumsum(_tree_probabilities(pruned, pruned_header, X_scaled, positive), axis=1)
+        cumulative_check = np.cumsum(_tree_probabilities(pruned, pruned_header, X_check, positive), axis=1)
+        for k in range(min_trees, n_trees + 1):
+            n_nodes = int(roots[k])
+            if best is not None and n_nodes >= best['n_nodes']:
+                continue
+            if ((cumulative_check[:, k - 1] / k > 0.5) == full_check).mean() < 1 - tolerance:
+                continue
+            probability = cumulative[:, k - 1] / k
+            if ((probability > 0.5) == y).mean() < baseline['accuracy'] - tolerance:
+                continue
+            if roc_auc_score(y, probability) < baseline['roc_auc'] - tolerance:
+                continue
+            best = {'epsilon': epsilon, 'n_trees': k, 'n_nodes': n_nodes}
+    search_seconds = time.perf_counter() - start
+
+    if best is None:
+        compacted, compacted_header = arrays, header
+        best = {'epsilon': None, 'n_trees': n_trees, 'n_nodes': header['n_nodes']}
+    else:
+        compacted, compacted_header = select_trees(
+            *prune_subtrees(arrays, header, best['epsilon']), best['n_trees'])
+    compacted = {**compacted, 'value': np.asarray(compacted['value'], dtype=np.float32)}
+
+    # Medidas finales con los arrays ya en float32, tal como se cargarán
+    original_forest = CompactForest(header, arrays)
+    compacted_forest = CompactForest(compacted_header, compacted)
+    probability = compacted_forest.predict_proba(X_scaled)[:, positive]
+    check = compacted_forest.predict_proba(X_check)[:, positive] > 0.5
+    report = {
+        'data_path': data_path,
+        'n_rows': int(len(y)),
+        'n_synthetic_rows': int(len(X_check)),
+        'tolerance': tolerance,
+        'epsilon': best['epsilon'],
+        'search_seconds': search_seconds,
+        'sklearn': _latency(forest.predict_proba, X_scaled),
+        'original': {
+            'n_trees': n_trees,
+            'n_nodes': header['n_nodes'],
+            'max_depth': header['max_depth'],
+            'bytes': size_bytes(arrays),
+            **baseline,
+            **_latency(original_forest.predict_proba, X_scaled)
+        },
+        'compacted': {
+            'n_trees': compacted_header['n_estimators'],
+            'n_nodes': compacted_header['n_nodes'],
+            'max_depth': compacted_header['max_depth'],
+            'bytes': size_bytes(compacted, COMPACT_DTYPES),
+            **_metrics(y, probability),
+            **_latency(compacted_forest.predict_proba, X_scaled)
+        },
+        'agreement': float(((probability > 0.5) == (full_probability > 0.5)).mean()),
+        'synthetic_agreement': float((check == full_check).mean()),
+        'max_abs_probability_diff': float(np.abs(probability - full_probability).max())
+    }
+    report['size_ratio'] = report['compacted']['bytes'] / report['original']['bytes']
+    compacted_header = {**compacted_header, 'compaction': report}
+    return compacted, compacted_header, report
+
+
+def save_compacted(arrays, header, path):
+    """Escribe el bosque compactado en el formato compacto (valores en float32)"""
+    return write_compact(arrays, header, path, COMPACT_DTYPES)
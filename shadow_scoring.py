@@ -0,0 +1,213 @@
+import time
+import queue
+import random
+import threading
+from collections import deque
+
+
+class ShadowScorer:
+    """
+    Evalúa un modelo candidato en sombra sobre una fracción del tráfico real
+
+    El modelo de producción sigue respondiendo; las peticiones muestreadas se
+    encolan (sin bloquear) y un hilo en segundo plano las puntúa con el
+    candidato para comparar acuerdo, deriva de probabilidad y latencia.
+    Si la cola está llena la muestra se descarta en lugar de esperar.
+
+    Las latencias se comparan por fila y por el mismo camino: la muestra de
+    un /predict/batch se puntúa con predict_batch del candidato (si lo
+    tiene) y su tiempo se reparte entre las filas, como el de producción.
+
+    El hilo comparte proceso (GIL y CPU) con el tráfico real, así que su
+    trabajo está acotado: como mucho `max_rows_per_second` filas por segundo
+    (cubo de fichas con ráfaga de un segundo), sea cual sea `fraction`; el
+    resto de la muestra se cuenta en `over_budget`. Con el bosque completo
+    (~10 ms por predict() individual) 10 filas/s suponen ~10% de un núcleo;
+    las muestras de lotes cuestan mucho menos por fila.
+    """
+    def __init__(self, max_queue=1000, latency_window=1000, max_rows_per_second=10.0):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._latency_window = latency_window
+        self._worker = None
+        self.candidate = None
+        self.candidate_version = None
+        self.fraction = 0.0
+        self.default_rows_per_second = max_rows_per_second
+        self.max_rows_per_second = max_rows_per_second
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.started_at = time.time()
+        self.sampled = 0
+        self.dropped = 0
+        self.over_budget = 0
+        self._budget = self.max_rows_per_second
+        self._budget_at = time.perf_counter()
+        self.compared = 0
+        self.agreements = 0
+        self.errors = 0
+        self.abs_diff_sum = 0.0
+        self.diff_sum = 0.0
+        self.max_abs_diff = 0.0
+        self.production_latencies = deque(maxlen=self._latency_window)
+        self.candidate_latencies = deque(maxlen=self._latency_window)
+
+    @property
+    def active(self):
+        return self.candidate is not None
+
+    def start(self, version, candidate_model, fraction=0.1, max_rows_per_second=None):
+        """Activa el modo sombra con un candidato ya cargado"""
+        if not 0.0 < fraction <= 1.0:
+            raise ValueError("La fracción debe estar en (0, 1]")
+        if max_rows_per_second is not None and max_rows_per_second <= 0:
+            raise ValueError("El presupuesto de filas por segundo debe ser positivo")
+
+        with self._lock:
+            self.candidate = candidate_model
+            self.candidate_version = version
+            self.fraction = fraction
+            self.max_rows_per_second = max_rows_per_second or self.default_rows_per_second
+            self._reset_stats()
+
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Desactiva el modo sombra; las muestras pendientes se descartan"""
+        with self._lock:
+            self.candidate = None
+            self.candidate_version = None
+            self.fraction = 0.0
+
+    def submit(self, pairs, production_results, production_latency):
+        """
+        Encola para el candidato una muestra de pares ya respondidos por
+        producción. Nunca bloquea: O(1) por par en el camino de la petición.
+        """
+        candidate = self.candidate
+        if candidate is None:
+            return
+
+        fraction = self.fraction
+        sampled = [
+            (pair, result)
+            for pair, result in zip(pairs, production_results)
+            if 'error' not in result and random.random() < fraction
+        ]
+        if not sampled:
+            return
+
+        with self._lock:
+            # Recargar el cubo de fichas y quedarse con lo que quepa
+            now = time.perf_counter()
+            self._budget = min(self.max_rows_per_second,
+                               self._budget + (now - self._budget_at) * self.max_rows_per_second)
+            self._budget_at = now
+            allowed = min(len(sampled), int(self._budget))
+            self._budget -= allowed
+            self.over_budget += len(sampled) - allowed
+        if not allowed:
+            return
+        sampled = sampled[:allowed]
+
+        per_item_latency = production_latency / max(len(pairs), 1)
+        try:
+            self._queue.put_nowait((candidate, sampled, per_item_latency, len(pairs) > 1))
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(sampled)
+            return
+        with self._lock:
+            self.sampled += len(sampled)
+
+    def _run(self):
+        while True:
+            candidate, sampled, production_latency, batched = self._queue.get()
+            if candidate is not self.candidate:
+                # El candidato cambió mientras la muestra esperaba en cola
+                continue
+
+            pairs = [pair for pair, _ in sampled]
+            scored = self._score(candidate, pairs, batched)
+            for (_, production), (result, candidate_latency) in zip(sampled, scored):
+                if result is None:
+                    with self._lock:
+                        self.errors += 1
+                    continue
+
+                diff = result['probability_suitable'] - production['probability_suitable']
+                with self._lock:
+                    self.compared += 1
+                    self.agreements += int(result['is_suitable'] == production['is_suitable'])
+                    self.diff_sum += diff
+                    self.abs_diff_sum += abs(diff)
+                    self.max_abs_diff = max(self.max_abs_diff, abs(diff))
+                    self.production_latencies.append(production_latency)
+                    self.candidate_latencies.append(candidate_latency)
+
+    @staticmethod
+    def _score(candidate, pairs, batched):
+        """
+        [(resultado o None si falló, latencia por fila)] del candidato, por
+        el mismo camino que producción: en lote si la petición era un lote
+        """
+        if batched and hasattr(candidate, 'predict_batch'):
+            start = time.perf_counter()
+            try:
+                results = candidate.predict_batch(pairs)
+                per_row = (time.perf_counter() - start) / len(pairs)
+                return [(result, per_row) for result in results]
+            except Exception:
+                pass  # se repite par a par para aislar el error
+
+        scored = []
+        for volunteer_data, project_data in pairs:
+            start = time.perf_counter()
+            try:
+                result = candidate.predict(volunteer_data, project_data)
+            except Exception:
+                result = None
+            scored.append((result, time.perf_counter() - start))
+        return scored
+
+    @staticmethod
+    def _latency_summary(latencies):
+        if not latencies:
+            return None
+        ordered = sorted(latencies)
+        return {
+            'mean_ms': 1000 * sum(ordered) / len(ordered),
+            'p50_ms': 1000 * ordered[len(ordered) // 2],
+            'p95_ms': 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        }
+
+    def stats(self):
+        """Resumen de la comparación candidato vs producción"""
+        with self._lock:
+            compared = self.compared
+            return {
+                'active': self.active,
+                'candidate_version': self.candidate_version,
+                'fraction': self.fraction,
+                'since': self.started_at,
+                'sampled': self.sampled,
+                'dropped': self.dropped,
+                'over_budget': self.over_budget,
+                'max_rows_per_second': self.max_rows_per_second,
+                'pending': self._queue.qsize(),
+                'compared': compared,
+                'errors': self.errors,
+                'agreement_rate': self.agreements / compared if compared else None,
+                'probability_drift': {
+                    'mean_diff': self.diff_sum / compared if compared else None,
+                    'mean_abs_diff': self.abs_diff_sum / compared if compared else None,
+                    'max_abs_diff': self.max_abs_diff if compared else None
+                },
+                'latency': {
+                    'production': self._latency_summary(self.production_latencies),
+                    'candidate': self._latency_summary(self.candidate_latencies)
+                }
+            }
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Invariantes del bosque completo: la salida temprana da las mismas etiquetas
+que evaluar todos los árboles (con cualquier umbral) y las contribuciones
+por característica suman la probabilidad
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from ml_model import VolunteerMLModel
+from warmup import warmup_pairs
+
+THRESHOLDS = (0.3, 0.5, 0.7)
+
+
+@lru_cache(maxsize=1)
+def trained_model():
+    model = VolunteerMLModel()
+    model.cv_folds = 2
+    model.train('data/training_data.csv')
+    return model
+
+
+def scaled_rows(n_rows=5000):
+    return trained_model().scale_pairs(warmup_pairs(n_rows, seed=11))
+
+
+def labels_with(model, X_scaled, early_exit, threshold, batch_size=10):
+    model.early_exit = early_exit
+    model.decision_threshold = threshold
+    model.early_exit_batch_size = batch_size
+    try:
+        labels, _ = model._label_scaled(X_scaled)
+    finally:
+        model.early_exit = False
+        model.decision_threshold = 0.5
+    return np.asarray(labels, dtype=bool)
+
+
+def test_early_exit_labels_match_full_forest():
+    model, X_scaled = trained_model(), scaled_rows()
+    for threshold in THRESHOLDS:
+        full = labels_with(model, X_scaled, False, threshold)
+        for batch_size in (1, 7, 10, 100):
+            early = labels_with(model, X_scaled, True, threshold, batch_size)
+            assert np.array_equal(full, early), (threshold, batch_size, int((full != early).sum()))
+
+
+def test_early_exit_exact_probability_for_rows_that_run_every_tree():
+    model, X_scaled = trained_model(), scaled_rows(500)
+    model.early_exit_batch_size = len(model.model.estimators_)
+    try:
+        _, probability = model.predict_proba_early_exit(X_scaled)
+    finally:
+        model.early_exit_batch_size = 10
+    assert np.allclose(probability, model.model.predict_proba(X_scaled))
+
+
+def test_contributions_sum_to_probability():
+    model, X_scaled = trained_model(), scaled_rows()
+    bias, contributions = model.explain_scaled(X_scaled)
+    probability = model.model.predict_proba(X_scaled)[:, 1]
+    assert np.allclose(bias + contributions.sum(axis=1), probability, atol=1e-9)
+
+
+def test_explain_batch_matches_explain_scaled():
+    model = trained_model()
+    pairs = warmup_pairs(50, seed=5)
+    probability = model.model.predict_proba(model.scale_pairs(pairs))[:, 1]
+    for explanation, p in zip(model.explain_batch(pairs), probability):
+        assert abs(explanation['bias'] + sum(explanation['contributions'].values()) - p) < 1e-9
+
+
+if __name__ == "__main__":
+    for test in (test_early_exit_labels_match_full_forest,
+                 test_early_exit_exact_probability_for_rows_that_run_every_tree,
+                 test_contributions_sum_to_probability, test_explain_batch_matches_explain_scaled):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Recuperación del log de resultados: segmentos con la cola truncada o con
+CRC incorrecto y compactaciones interrumpidas antes de borrar los segmentos
+"""
+import os
+import shutil
+import tempfile
+
+from outcome_log import OUTCOME_COLUMNS, OutcomeLog, read_segment, read_training_table, table_parts
+
+
+def make_rows(n_rows, offset=0):
+    return [[float(offset + i)] * (len(OUTCOME_COLUMNS) - 1) + [i % 2] for i in range(n_rows)]
+
+
+def test_torn_tail_is_ignored():
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = OutcomeLog(log_dir)
+        log.append(make_rows(10))
+        log.append(make_rows(5, offset=10))
+        log.close()
+        segment = log._segments()[-1]
+
+        # Escritura interrumpida: falta el final del último registro
+        with open(segment, 'r+b') as f:
+            f.truncate(os.path.getsize(segment) - 8)
+        assert [len(payload) // (8 * len(OUTCOME_COLUMNS)) for payload in read_segment(segment)] == [10]
+        assert OutcomeLog(log_dir).pending_rows == 10
+
+
+def test_bad_crc_stops_the_segment():
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = OutcomeLog(log_dir)
+        log.append(make_rows(10))
+        log.append(make_rows(5, offset=10))
+        log.close()
+        segment = log._segments()[-1]
+
+        # Un byte cambiado en el payload del último registro
+        with open(segment, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+
+        reopened = OutcomeLog(log_dir)
+        assert reopened.pending_rows == 10
+        assert reopened.compact()['total_rows'] == 10
+        assert read_training_table(reopened.table_path)['reliability'].tolist() == [float(i) for i in range(10)]
+
+
+def test_interrupted_compaction_does_not_duplicate_rows():
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = OutcomeLog(log_dir)
+        log.append(make_rows(20))
+        backup = os.path.join(log_dir, 'backup')
+        os.makedirs(backup)
+        log._seal_active()
+        for path in log._segments():
+            shutil.copy(path, backup)
+        log.pending_rows = 20
+        assert log.compact()['total_rows'] == 20
+        log.close()
+
+        # Caída entre publicar la parte y borrar sus segmentos
+        for name in os.listdir(backup):
+            shutil.copy(os.path.join(backup, name), log_dir)
+
+        reopened = OutcomeLog(log_dir)
+        assert reopened.pending_rows == 0
+        assert reopened._segments() == []
+        reopened.append(make_rows(5, offset=20))
+        assert reopened.compact()['total_rows'] == 25
+        assert len(read_training_table(reopened.table_path)) == 25
+
+
+def test_merge_keeps_every_row_once():
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = OutcomeLog(log_dir, max_parts=3)
+        for i in range(7):
+            log.append(make_rows(10, offset=10 * i))
+            log.compact()
+        assert len(table_parts(log.table_path)) <= 3
+        table = read_training_table(log.table_path)
+        assert sorted(table['reliability'].tolist()) == [float(i) for i in range(70)]
+
+
+if __name__ == "__main__":
+    for test in (test_torn_tail_is_ignored, test_bad_crc_stops_the_segment,
+                 test_interrupted_compaction_does_not_duplicate_rows, test_merge_keeps_every_row_once):
+        test()
+        print(f"✅ {test.__name__}")
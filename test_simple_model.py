@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Paridad entre predict() y predict_batch() del modelo simple basado en reglas,
+incluidas entradas con NaN, infinitos, None y claves ausentes
+"""
+import math
+import random
+
+from ml_model_simple import VolunteerMLModel
+from benchmark_simple_model import generate_pairs
+
+SPECIAL_VALUES = [float('nan'), float('inf'), -float('inf'), None, 0, -1]
+
+
+def same_result(a, b):
+    """Igualdad de resultados tratando NaN como igual a NaN"""
+    if a.keys() != b.keys():
+        return False
+    for key in a:
+        x, y = a[key], b[key]
+        if isinstance(x, float) and isinstance(y, float) and math.isnan(x) and math.isnan(y):
+            continue
+        if x != y:
+            return False
+    return True
+
+
+def special_pairs(n_pairs=2000, seed=7):
+    """Pares sintéticos con uno o dos campos sustituidos por valores especiales o eliminados"""
+    rng = random.Random(seed)
+    pairs = []
+    for volunteer, project in generate_pairs(n_pairs, seed=seed):
+        for _ in range(rng.randint(1, 2)):
+            data = rng.choice([volunteer, project])
+            key = rng.choice(list(data))
+            if rng.random() < 0.2:
+                del data[key]
+            else:
+                data[key] = rng.choice(SPECIAL_VALUES)
+        pairs.append((volunteer, project))
+    return pairs
+
+
+def assert_parity(model, pairs):
+    batch = model.predict_batch(pairs)
+    assert len(batch) == len(pairs)
+    for (volunteer, project), result in zip(pairs, batch):
+        expected = model.predict(volunteer, project)
+        assert same_result(expected, result), (volunteer, project, expected, result)
+
+
+def test_batch_matches_predict():
+    assert_parity(VolunteerMLModel(), generate_pairs(5000))
+
+
+def test_batch_matches_predict_with_nan_and_none():
+    assert_parity(VolunteerMLModel(), special_pairs())
+
+
+def test_nan_is_clamped_like_predict():
+    model = VolunteerMLModel()
+    volunteer, project = generate_pairs(1)[0]
+    for key in ('total_projects', 'total_hours', 'availability_hours'):
+        pair = ({**volunteer, key: float('nan')}, project)
+        assert same_result(model.predict(*pair), model.predict_batch([pair])[0])
+
+
+if __name__ == "__main__":
+    for test in (test_batch_matches_predict, test_batch_matches_predict_with_nan_and_none,
+                 test_nan_is_clamped_like_predict):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,57 @@
+import math
+import random
+
+# Tipos de voluntario de generate_data.py: (probabilidad, media de reliability,
+# punctuality y task_quality, desviación, proyectos (media Poisson, mínimo),
+# tasa de éxito base y rango de horas disponibles)
+VOLUNTEER_TYPES = (
+    (0.2, (8.5, 8.5, 8.5), 1.0, (15, 5), 0.9, (15, 40)),
+    (0.3, (7.0, 7.2, 7.0), 1.2, (8, 2), 0.8, (15, 40)),
+    (0.3, (5.5, 6.0, 5.8), 1.5, (5, 0), 0.6, (5, 25)),
+    (0.2, (3.5, 4.0, 4.0), 1.8, (2, 0), 0.3, (5, 25))
+)
+
+
+def _poisson(rng, mean):
+    """Muestra de Poisson (Knuth) con la librería estándar"""
+    limit, k, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        k += 1
+        product *= rng.random()
+    return k
+
+
+def warmup_pairs(n_pairs, seed=42):
+    """
+    Pares (voluntario, proyecto) sintéticos con las distribuciones de
+    generate_data.py para calentar el modelo al arrancar. Solo usa la
+    librería estándar (sirve también en el nivel simple) y un generador
+    propio, sin tocar el estado aleatorio global.
+    """
+    rng = random.Random(seed)
+    weights = [volunteer_type[0] for volunteer_type in VOLUNTEER_TYPES]
+    pairs = []
+    for _ in range(n_pairs):
+        _, means, sigma, (projects_mean, projects_min), base_rate, availability = rng.choices(
+            VOLUNTEER_TYPES, weights)[0]
+        reliability, punctuality, task_quality = (min(10, max(0, rng.gauss(mean, sigma))) for mean in means)
+        total_projects = _poisson(rng, projects_mean) + projects_min
+        completed_projects = min(total_projects, max(0, int(total_projects * rng.uniform(base_rate - 0.2,
+                                                                                         base_rate + 0.1))))
+        volunteer = {
+            'reliability': round(reliability, 2),
+            'punctuality': round(punctuality, 2),
+            'task_quality': round(task_quality, 2),
+            'success_rate': round(completed_projects / total_projects, 3) if total_projects else 0.0,
+            'total_projects': total_projects,
+            'completed_projects': completed_projects,
+            'total_hours': round(rng.expovariate(1 / 50) + total_projects * 8, 1),
+            'availability_hours': round(rng.uniform(*availability), 1)
+        }
+        project = {
+            'project_duration': round(rng.uniform(1, 12), 1),
+            'project_complexity': round(rng.uniform(1, 10), 1),
+            'required_hours': round(rng.uniform(10, 60), 1)
+        }
+        pairs.append((volunteer, project))
+    return pairs